@@ -7,25 +7,20 @@ Requisiti:
 
 import sys, time
 import numpy as np
-import matplotlib.pyplot as plt
-from seabreeze.spectrometers import Spectrometer
+from specdev import open_spectrometer
 from seabreeze._exc import SeaBreezeError           # gestione errori
-
-# ---------- funzioni utili --------------------------------------------------
-
-def boxcar_smooth(y: np.ndarray, half_width: int) -> np.ndarray:
-    """Lisce con una finestra di larghezza (2*half_width+1)."""
-    if half_width < 1:
-        return y
-    kernel = np.ones(2*half_width + 1, dtype=float) / (2*half_width + 1)
-    return np.convolve(y, kernel, mode="same")
+from specavg import Averager
+from specrec import Recorder
+from specsmooth import boxcar
+from specref import References, LABELS, COLUMNS
+from specauto import AutoExposure, saturation_of, limits_of
 
 # ---------- script principale ----------------------------------------------
 
 def main():
     try:
-        spec = Spectrometer.from_first_available()
-    except SeaBreezeError as e:
+        spec = open_spectrometer()
+    except (SeaBreezeError, OSError) as e:
         sys.exit(f"Errore: nessuno spettrometro trovato ({e}).")
 
     print(f"Trovato: {spec.model}  S/N: {spec.serial_number}")
@@ -35,30 +30,60 @@ def main():
     n_average = 5             # spettri da mediare
     dark_correct = True       # sottrae i dark counts
     boxcar_px = 2             # lisciatura boxcar (pixel per lato)
+    record_path = None        # es. "usb2000_raw.usbspec": salva anche i singoli frame
+    mode = "counts"           # counts | transmittance | absorbance
+    capture = None            # "dark" o "reference": salva la media in cache ed esce
+    auto_integ = False        # sceglie integ_ms per riempire l'80% della saturazione
 
     spec.integration_time_micros(integ_ms * 1000)  # libreria vuole µs
     wl = spec.wavelengths()                         # array 4096-px
 
-    # Acquisizione + media
-    spec_sum = np.zeros_like(wl, dtype=float)
-    print(f"Acquisisco {n_average} spettri da {integ_ms} ms…")
-    for i in range(n_average):
-        counts = spec.intensities(correct_dark_counts=dark_correct)
-        counts = boxcar_smooth(counts, boxcar_px)
-        spec_sum += counts
-        time.sleep(integ_ms / 1000)
+    if auto_integ:
+        auto = AutoExposure(saturation_of(spec), integ_ms * 1000, limits=limits_of(spec),
+                            apply=spec.integration_time_micros)
+        while not auto.converged and auto.frames < 20:
+            auto(spec.intensities(correct_dark_counts=dark_correct))
+        integ_ms = auto.integ_us / 1000
+        print(f"Integrazione automatica: {integ_ms:.1f} ms dopo {auto.frames} frame"
+              + ("" if auto.converged else " (non convergente)"))
 
-    spectrum = spec_sum / n_average
+    # dark/riferimento dalla cache (stesso seriale, integrazione, correzione)
+    refs = References(spec.serial_number, wl, integ_ms * 1000, dark_correct)
+    if capture is None and mode != "counts" and refs.meta["reference"] is None:
+        spec.close()
+        sys.exit(f"Errore: {mode} richiede un riferimento valido (imposta capture = \"reference\").")
+    print(f"Dark/riferimento: {refs.describe()}")
+
+    # Acquisizione + media (lisciatura una sola volta, dopo dark/riferimento)
+    avg = Averager(len(wl), n_average, "block")
+    rec = None
+    if record_path:
+        rec = Recorder(record_path, wl, model=spec.model,
+                       serial=spec.serial_number, integ_ms=integ_ms)
+    print(f"Acquisisco {n_average} spettri da {integ_ms} ms…")
+    spectrum = avg.acquire(spec, dark_correct, sink=rec.write if rec else None)
+    if rec:
+        rec.close()
+        print(f"Frame grezzi salvati in {record_path}")
+    print(f"Frequenza: {avg.duty_text(integ_ms)}")
     spec.close()   # buona abitudine
 
+    if capture:
+        refs.store(capture, spectrum, n_average)
+        print(f"{capture} salvato in {refs.cache.path(capture, integ_ms * 1000, dark_correct)}")
+        return
+    refs.set_mode(mode)
+    spectrum = boxcar(refs.process(spectrum), boxcar_px)
+
     # Salva e visualizza
     out = np.column_stack([wl, spectrum])
     np.savetxt("usb2000_spectrum.tsv", out,
-               header="wavelength_nm\tintensity_counts")
+               header=f"wavelength_nm\t{COLUMNS[mode]}")
 
+    import matplotlib.pyplot as plt                 # solo qui: lento da importare
     plt.plot(wl, spectrum)
     plt.xlabel("Lunghezza d'onda (nm)")
-    plt.ylabel("Conteggi")
+    plt.ylabel(LABELS[mode])
     plt.title("USB2000 – spettro medio")
     plt.tight_layout()
     plt.show()
@@ -0,0 +1,144 @@
+# specacq.py
+"""
+Acquisizione in background per i viewer live.
+
+Un thread produttore legge gli spettri uno dopo l'altro (senza attese tra
+una lettura e l'altra) e li scrive in un buffer circolare preallocato con
+gli ultimi N frame. La GUI preleva solo il frame più recente alla propria
+frequenza di refresh; i frame sovrascritti senza essere mostrati vengono
+contati come "persi".
+Dipendenze: numpy
+"""
+
+import threading, time
+import numpy as np
+from specprof import Profiler
+
+# ---------- buffer circolare ----------------------------------------------
+
+class FrameRing:
+    """Buffer circolare (n_frames × n_pixels) con timestamp monotoni."""
+
+    def __init__(self, n_frames: int, n_pixels: int, dtype=np.float64):
+        self.n_frames = n_frames
+        self.data = np.zeros((n_frames, n_pixels), dtype=dtype)
+        self.t = np.zeros(n_frames)          # time.monotonic() di ogni frame
+        self.written = 0                     # frame scritti in totale
+        self.read = 0                        # indice dell'ultimo frame consegnato
+        self.dropped = 0                     # frame mai consegnati
+        self._lock = threading.Lock()
+
+    def push(self, counts: np.ndarray, t: float):
+        """Copia `counts` nello slot successivo (sovrascrive il più vecchio)."""
+        with self._lock:
+            i = self.written % self.n_frames
+            self.data[i] = counts
+            self.t[i] = t
+            self.written += 1
+
+    def depth(self) -> int:
+        """Frame scritti e non ancora consegnati (al massimo n_frames)."""
+        return min(self.written - self.read, self.n_frames)
+
+    def latest(self, out: np.ndarray = None):
+        """
+        Restituisce (counts, t) del frame più recente non ancora letto,
+        oppure None. I frame saltati si sommano a `dropped`.
+        """
+        with self._lock:
+            if self.written == self.read:
+                return None
+            self.dropped += self.written - self.read - 1
+            self.read = self.written
+            i = (self.written - 1) % self.n_frames
+            if out is None:
+                out = np.empty_like(self.data[i])
+            out[...] = self.data[i]
+            return out, self.t[i]
+
+# ---------- thread di acquisizione ----------------------------------------
+
+class AcqWorker(threading.Thread):
+    """Legge `spec.intensities()` a ciclo continuo e riempie un FrameRing."""
+
+    def __init__(self, spec, ring: FrameRing, integ_ms: float = None,
+                 dark_correct: bool = True):
+        super().__init__(daemon=True)
+        self.spec = spec
+        self.ring = ring
+        self.integ_ms = integ_ms             # solo per il duty-cycle in status
+        self.dark_correct = dark_correct
+        self.errors = 0
+        self.fps = 0.0                       # frequenza media (EMA)
+        self.sinks = []                      # callable (counts, t) per ogni frame
+        self.prof = Profiler()               # sonde usb/sinks, disattivate
+        self._integ_us = None                # cambio di integrazione in attesa
+        self._integ_lock = threading.Lock()
+        self._halt = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
+
+    def run(self):
+        t_prev = None
+        prof = self.prof
+        while not self._halt.is_set():
+            if not self._running.wait(0.1):
+                t_prev = None
+                continue
+            prof.begin()
+            try:
+                with self._integ_lock:
+                    us, self._integ_us = self._integ_us, None
+                if us is not None:
+                    self.spec.integration_time_micros(us)
+                    self.integ_ms = us / 1000
+                counts = self.spec.intensities(correct_dark_counts=self.dark_correct)
+            except Exception as e:
+                # errore USB momentaneo: conta, attende un attimo e riprova
+                self.errors += 1
+                print("Errore lettura:", e)
+                self._halt.wait(0.05)
+                continue
+            prof.lap("usb")
+            t = time.monotonic()
+            self.ring.push(counts, t)
+            for sink in self.sinks:          # es. Recorder.write: deve essere rapido
+                try:
+                    sink(counts, t)
+                except Exception as e:       # un sink difettoso non ferma l'acquisizione
+                    self.errors += 1
+                    print("Errore sink:", e)
+            prof.lap("sinks")
+            if t_prev is not None and t > t_prev:
+                rate = 1.0 / (t - t_prev)
+                self.fps = rate if not self.fps else 0.9 * self.fps + 0.1 * rate
+            t_prev = t
+
+    # ------------------------------------------------------------------
+    def pause(self):
+        self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    def set_integration(self, us: int):
+        """Cambia l'integrazione tra due letture (chiamabile da qualsiasi thread)."""
+        with self._integ_lock:
+            self._integ_us = int(us)
+
+    def stop(self, timeout: float = 2.0):
+        """Ferma il thread e attende la fine della lettura in corso."""
+        self._halt.set()
+        self._running.set()
+        if self.is_alive():
+            self.join(timeout)
+
+    def status(self) -> str:
+        """Riassunto per la status-bar: frequenza, coda, frame persi, errori."""
+        if self.integ_ms:
+            rate = f"{self.fps:5.1f}/{1000 / self.integ_ms:.0f} fps"
+        else:
+            rate = f"{self.fps:5.1f} fps"
+        r = self.ring
+        return (f"acq {rate} | coda {r.depth()}/{r.n_frames}"
+                f" | persi {r.dropped} | errori {self.errors}")
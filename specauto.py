@@ -0,0 +1,113 @@
+# specauto.py
+"""
+Integrazione automatica: dal frame appena letto prevede il tempo di
+integrazione che porta il segnale alla frazione `target` della saturazione.
+
+Il segnale (corretto dal buio) cresce linearmente con l'integrazione, quindi
+il passo è moltiplicativo: t_nuovo = t · target / riempimento, dove il
+riempimento è il picco (o un percentile) diviso per la saturazione del
+rivelatore. Se il frame è saturo il livello vero non è noto e si divide per
+1/SAT_STEP. Entro la banda target ± tol non si cambia nulla (niente
+oscillazioni); fuori banda si corregge al frame successivo, così la
+regolazione segue anche le variazioni di sorgente durante il live.
+
+I frame usati per regolare (quelli che hanno provocato un cambio più i
+`settle` scartati subito dopo) sono contati in `wasted`.
+
+    auto = AutoExposure(saturation_of(spec), 10000, apply=worker.set_integration)
+    worker.sinks.append(auto)          # gira nel thread di acquisizione
+Dipendenze: numpy
+"""
+
+import numpy as np
+
+SAT_FRACTION = 0.95               # oltre questa frazione il frame è considerato saturo
+SAT_STEP = 0.25                   # riduzione quando il frame è saturo
+MAX_STEP = 50.0                   # passo massimo in salita per frame
+SETTLE_FRAMES = 1                 # frame da scartare dopo un cambio (il primo può essere
+                                  # ancora all'integrazione precedente)
+SATURATION = {"USB2000": 4095, "USB4000": 65535}
+INTEG_LIMITS_US = (1000, 65_000_000)
+
+def saturation_of(spec) -> float:
+    """Conteggio di saturazione: max_intensity di seabreeze, altrimenti dal modello."""
+    sat = getattr(spec, "max_intensity", None)
+    if sat:
+        return float(sat)
+    return float(SATURATION.get(str(getattr(spec, "model", "")).upper(), 65535))
+
+def limits_of(spec) -> tuple:
+    """Limiti di integrazione (µs) dichiarati dal dispositivo, se disponibili."""
+    lim = getattr(spec, "integration_time_micros_limits", None)
+    return tuple(int(x) for x in lim) if lim else INTEG_LIMITS_US
+
+# ---------- regolatore ----------------------------------------------------
+
+class AutoExposure:
+    def __init__(self, saturation: float, integ_us: int, target: float = 0.8,
+                 tol: float = 0.1, stat: str = "peak", pct: float = 99.5,
+                 limits: tuple = INTEG_LIMITS_US, settle: int = SETTLE_FRAMES,
+                 offset: float = 0.0, apply=None):
+        if stat not in ("peak", "percentile"):
+            raise ValueError(f"statistica sconosciuta: {stat!r} (usa 'peak' o 'percentile')")
+        self.saturation = float(saturation)
+        self.integ_us = int(integ_us)
+        self.target, self.tol = target, tol
+        self.stat, self.pct = stat, pct
+        self.limits = limits
+        self.settle = settle
+        self.offset = offset              # conteggi a integrazione nulla (0 se corretti dal buio)
+        self.apply = apply                # callable(us): es. AcqWorker.set_integration
+        self.enabled = True
+        self.reset()
+
+    def reset(self):
+        self.frames = 0                   # frame esaminati
+        self.wasted = 0                   # frame spesi per la regolazione
+        self.changes = 0
+        self.fill = None                  # riempimento dell'ultimo frame
+        self.converged = False
+        self._skip = 0
+
+    # ------------------------------------------------------------------
+    def next_integration(self, counts: np.ndarray) -> int:
+        """Integrazione (µs) prevista per il prossimo frame; aggiorna `fill`."""
+        span = self.saturation - self.offset
+        peak = float(counts.max())
+        level = peak if self.stat == "peak" else float(np.percentile(counts, self.pct))
+        self.fill = (level - self.offset) / span
+        if peak - self.offset >= SAT_FRACTION * span:
+            factor = SAT_STEP
+        elif abs(self.fill - self.target) <= self.tol:
+            return self.integ_us
+        elif self.fill <= 0:
+            factor = MAX_STEP
+        else:
+            factor = min(self.target / self.fill, MAX_STEP)
+        return int(np.clip(round(self.integ_us * factor), *self.limits))
+
+    def __call__(self, counts: np.ndarray, t: float = None):
+        """Sink per AcqWorker: esamina il frame e, se serve, cambia integrazione."""
+        if not self.enabled:
+            return
+        self.frames += 1
+        if self._skip:
+            self._skip -= 1
+            self.wasted += 1
+            return
+        us = self.next_integration(counts)
+        if us == self.integ_us:           # in banda, oppure al limite del dispositivo
+            self.converged = True
+            return
+        self.integ_us = us
+        self.changes += 1
+        self.wasted += 1
+        self.converged = False
+        self._skip = self.settle
+        if self.apply is not None:
+            self.apply(us)
+
+    def status(self) -> str:
+        fill = f"{100 * self.fill:.0f}%" if self.fill is not None else "—"
+        state = "ok" if self.converged else "…"
+        return f"auto {self.integ_us / 1000:.1f} ms {state} (riemp. {fill}, sprecati {self.wasted})"
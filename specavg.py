@@ -0,0 +1,119 @@
+# specavg.py
+"""
+Motore di media degli spettri condiviso da spec.py e dai viewer live.
+
+Modalità:
+    block    → media di n frame consecutivi, un risultato ogni n letture
+    running  → media esponenziale (alpha = 2/(n+1)), un risultato per frame
+    sliding  → media mobile sugli ultimi n frame, un risultato per frame
+
+I frame vengono scritti in un buffer 2-D preallocato (n × pixel); la
+lisciatura, essendo lineare, viene applicata una sola volta al risultato.
+Nessuna attesa tra le letture: `intensities()` blocca già per il tempo di
+integrazione.
+Dipendenze: numpy
+"""
+
+import time
+import numpy as np
+
+MODES = ("block", "running", "sliding")
+
+# ---------- media ---------------------------------------------------------
+
+class Averager:
+    def __init__(self, n_pixels: int, n_avg: int = 1, mode: str = "block",
+                 smooth=None):
+        if mode not in MODES:
+            raise ValueError(f"modalità sconosciuta: {mode!r} (usa {MODES})")
+        self.n_avg = max(1, int(n_avg))
+        self.mode = mode
+        self.smooth = smooth                  # callable y -> y, o None
+        self.buf = np.zeros((self.n_avg, n_pixels))
+        self.acc = np.zeros(n_pixels)         # somma (sliding) o EMA (running)
+        self.out = np.zeros(n_pixels)
+        self._tmp = np.zeros(n_pixels)
+        self.alpha = 2.0 / (self.n_avg + 1)
+        self._t = np.zeros(self.n_avg + 1)    # istanti degli ultimi frame
+        self.reset()
+
+    def reset(self):
+        """Svuota il buffer (da chiamare se cambiano i parametri)."""
+        self.count = 0                        # frame accumulati
+        self.frames = 0                       # frame ricevuti in totale
+        self.acc[:] = 0
+
+    # ------------------------------------------------------------------
+    def add(self, counts: np.ndarray):
+        """
+        Aggiunge un frame. Restituisce lo spettro mediato (e lisciato) quando
+        disponibile, altrimenti None (solo in modalità block).
+        Il risultato è un buffer interno riusato: resta valido fino alla
+        chiamata successiva, va copiato (.copy()) se deve essere conservato.
+        """
+        self._t[self.frames % len(self._t)] = time.perf_counter()
+        self.frames += 1
+        n = self.n_avg
+
+        if self.mode == "block":
+            self.buf[self.count] = counts
+            self.count += 1
+            if self.count < n:
+                return None
+            self.count = 0
+            np.mean(self.buf, axis=0, out=self.out)
+
+        elif self.mode == "sliding":
+            i = (self.frames - 1) % n
+            if self.count == n:               # esce il frame più vecchio
+                self.acc -= self.buf[i]
+            else:
+                self.count += 1
+            self.buf[i] = counts
+            self.acc += self.buf[i]
+            if i == n - 1:                    # ricalcolo periodico: niente deriva
+                np.sum(self.buf[:self.count], axis=0, out=self.acc)
+            np.divide(self.acc, self.count, out=self.out)
+
+        else:                                 # running (EMA)
+            if self.count == 0:
+                self.acc[:] = counts
+                self.count = 1
+            else:
+                np.subtract(counts, self.acc, out=self._tmp)
+                self._tmp *= self.alpha
+                self.acc += self._tmp
+            self.out[:] = self.acc
+
+        if self.smooth is not None:
+            return self.smooth(self.out)
+        return self.out
+
+    def acquire(self, spec, dark_correct: bool = True, sink=None):
+        """
+        Legge dallo spettrometro finché `add` non produce un risultato.
+        `sink(counts)`, se dato, riceve ogni singolo frame (es. Recorder.write).
+        """
+        while True:
+            counts = spec.intensities(correct_dark_counts=dark_correct)
+            if sink is not None:
+                sink(counts)
+            res = self.add(counts)
+            if res is not None:
+                return res
+
+    # ------------------------------------------------------------------
+    def fps(self) -> float:
+        """Frame al secondo misurati sugli ultimi n+1 frame."""
+        k = min(self.frames, len(self._t))
+        if k < 2:
+            return 0.0
+        last = (self.frames - 1) % len(self._t)
+        first = (self.frames - k) % len(self._t)
+        dt = self._t[last] - self._t[first]
+        return (k - 1) / dt if dt > 0 else 0.0
+
+    def duty_text(self, integ_ms: float) -> str:
+        """Frequenza ottenuta contro il limite teorico 1/integrazione."""
+        fps, fps_max = self.fps(), 1000.0 / integ_ms
+        return f"{fps:.1f}/{fps_max:.1f} fps (duty {100 * fps / fps_max:.0f}%)"
@@ -0,0 +1,226 @@
+# specbatch.py
+"""
+Rielaborazione in blocco di archivi di spettri CSV (es. examples/data/usb2000_*/*.csv).
+
+Per ogni file: sottrazione del dark (opzionale), lisciatura boxcar,
+statistiche e picchi (specpeaks), PNG di grafico + strip CCD (opzionale).
+Il lavoro è distribuito su un ProcessPoolExecutor a blocchi di `--chunk`
+file per task. I file già elaborati con le stesse opzioni si riconoscono
+dall'hash SHA-1 del contenuto (cache in <cartella>/.speccache/) e vengono
+saltati. I risultati finiscono in un solo file colonnare: .npz (un array
+per colonna) oppure .csv.
+
+    python specbatch.py examples/data -o risultati.npz [-j 4] [--dark dark.csv] [--png DIR]
+    python specbatch.py examples/data --scaling      # file/s con 1, 2, 4, … processi
+Dipendenze: numpy (matplotlib solo con --png)
+"""
+
+import os, sys, json, time, hashlib, argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from specsmooth import boxcar
+from specpeaks import PeakTracker
+from specdata import CACHE
+
+CHUNK = 8                         # file per task inviato a un processo
+PEAK_COLS = ("pos", "fwhm", "area")
+_CACHE_VERSION = 3                # da incrementare se cambia l'elaborazione (es. specpeaks)
+
+# ---------- elaborazione di un file (nei processi) ------------------------
+
+def _render_png(path: str, wl: np.ndarray, y: np.ndarray, title: str):
+    """Grafico + strip CCD in un PNG (stessi colori di specccd)."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from specccd import wavelength_to_rgb
+
+    peak = y.max()
+    strip = np.clip(wavelength_to_rgb(wl) * (y / peak if peak > 0 else y)[:, None], 0, 1)
+    fig, (ax, ax_ccd) = plt.subplots(2, 1, figsize=(9, 5), sharex=True,
+                                     gridspec_kw=dict(height_ratios=(8, 1)))
+    ax.plot(wl, y, lw=1)
+    ax.set_ylabel("Conteggi")
+    ax.set_title(title)
+    ax_ccd.imshow(strip[None], aspect="auto", extent=(wl[0], wl[-1], 0, 1))
+    ax_ccd.set_yticks([])
+    ax_ccd.set_xlabel("Lunghezza d'onda (nm)")
+    fig.savefig(path, dpi=100)
+    plt.close(fig)
+
+def process_file(job: tuple) -> dict:
+    """Una riga di risultati per un CSV; `error` non vuoto se la lettura fallisce."""
+    path, digest, opts = job
+    row = dict(path=path, sha1=digest, error="")
+    try:
+        data = np.loadtxt(path, delimiter=",", skiprows=1, ndmin=2)
+        wl, y = data[:, 0], data[:, 1]
+        if opts["dark"] is not None:
+            if len(opts["dark"]) != len(y):
+                raise ValueError(f"dark di {len(opts['dark'])} px, file di {len(y)} px")
+            y = y - opts["dark"]
+        y = boxcar(y, opts["smooth"])
+    except (OSError, ValueError) as e:
+        row["error"] = str(e)
+        return row
+    res = PeakTracker(wl, max_peaks=opts["max_peaks"]).update(y)
+    found = np.isfinite(res["pos"])
+    order = np.argsort(np.where(found, -res["height"], np.inf), kind="stable")  # slot 1 = più alto, persi in fondo
+    row.update(n_pixels=len(y), wl_min=float(wl[0]), wl_max=float(wl[-1]),
+               min=float(y.min()), max=float(y.max()), mean=float(y.mean()),
+               n_peaks=int(found.sum()))
+    for q in PEAK_COLS:
+        v = np.full(opts["max_peaks"], np.nan)
+        v[:len(order)] = res[q][order]
+        row[q] = v.tolist()
+    if opts["png"]:
+        name = os.path.splitext(os.path.basename(path))[0] + "_batch.png"
+        _render_png(os.path.join(opts["png"], name), wl, y, os.path.basename(path))
+    return row
+
+# ---------- scansione e cache ---------------------------------------------
+
+def find_csv(root: str) -> list:
+    out = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d != CACHE)
+        out += [os.path.join(dirpath, f) for f in sorted(filenames) if f.endswith(".csv")]
+    return out
+
+def file_sha1(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def options_key(opts: dict) -> str:
+    """Hash delle opzioni che cambiano i risultati (dark incluso, PNG esclusi: si controlla il file)."""
+    d = dict(opts, dark=None if opts["dark"] is None
+             else hashlib.sha1(np.ascontiguousarray(opts["dark"]).tobytes()).hexdigest())
+    d.pop("png", None)
+    d["version"] = _CACHE_VERSION
+    return hashlib.sha1(json.dumps(d, sort_keys=True).encode()).hexdigest()[:16]
+
+class ResultCache:
+    """sha1 del contenuto → riga di risultati, per un insieme di opzioni."""
+
+    def __init__(self, root: str, opts: dict):
+        self.path = os.path.join(root, CACHE, f"batch_{options_key(opts)}.json")
+        try:
+            with open(self.path) as f:
+                self.rows = json.load(f)
+        except (OSError, ValueError):
+            self.rows = {}
+
+    def get(self, digest: str):
+        return self.rows.get(digest)
+
+    def put(self, row: dict):
+        if not row["error"]:                       # gli errori si riprovano
+            self.rows[row["sha1"]] = row
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path + ".tmp", "w") as f:
+                json.dump(self.rows, f)
+            os.replace(self.path + ".tmp", self.path)
+        except OSError as e:                       # cache non scrivibile: si prosegue
+            print("Cache non salvata:", e)
+
+# ---------- esecuzione ----------------------------------------------------
+
+def run(jobs: list, workers: int, chunk: int = CHUNK) -> list:
+    """Elabora i job su `workers` processi (1 → nello stesso processo)."""
+    if workers <= 1:
+        return [process_file(j) for j in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        return list(ex.map(process_file, jobs, chunksize=chunk))
+
+def write_columns(path: str, rows: list, max_peaks: int):
+    """Un array per colonna (.npz) o le stesse colonne in un CSV."""
+    ok = [r for r in rows if not r["error"]]
+    cols = {k: np.array([r[k] for r in ok]) for k in
+            ("path", "sha1", "n_pixels", "wl_min", "wl_max", "min", "max", "mean", "n_peaks")}
+    for q in PEAK_COLS:
+        v = np.array([r[q] for r in ok]).reshape(len(ok), max_peaks)
+        for i in range(max_peaks):
+            cols[f"{q}{i + 1}"] = v[:, i]
+    if path.endswith(".csv"):
+        names = list(cols)
+        with open(path, "w") as f:
+            f.write(",".join(names) + "\n")
+            for i in range(len(ok)):
+                f.write(",".join(str(cols[k][i]) for k in names) + "\n")
+    else:
+        np.savez(path, **cols)
+
+def scaling(jobs: list, chunk: int, max_workers: int):
+    """file/s con 1, 2, 4, … processi (cache ignorata)."""
+    counts = sorted({2 ** k for k in range(max_workers.bit_length()) if 2 ** k <= max_workers}
+                    | {max_workers})
+    base = None
+    for n in counts:
+        t0 = time.perf_counter()
+        run(jobs, n, chunk)
+        rate = len(jobs) / (time.perf_counter() - t0)
+        base = base or rate
+        print(f"  {n:3d} processi: {rate:8.1f} file/s  (×{rate / base:.2f})")
+
+# --------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Rielaborazione in blocco di spettri CSV")
+    ap.add_argument("root")
+    ap.add_argument("-o", "--output", default="batch_results.npz", help=".npz o .csv")
+    ap.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="processi")
+    ap.add_argument("--chunk", type=int, default=CHUNK, help="file per task")
+    ap.add_argument("--smooth", type=int, default=1, help="boxcar: pixel per lato (0 = no)")
+    ap.add_argument("--dark", help="CSV del dark da sottrarre")
+    ap.add_argument("--max-peaks", type=int, default=5)
+    ap.add_argument("--png", metavar="DIR", help="salva grafico + CCD di ogni file in DIR")
+    ap.add_argument("--force", action="store_true", help="ignora la cache")
+    ap.add_argument("--scaling", action="store_true", help="misura file/s al variare dei processi")
+    args = ap.parse_args()
+
+    dark = None
+    if args.dark:
+        try:
+            dark = np.loadtxt(args.dark, delimiter=",", skiprows=1, ndmin=2)[:, 1]
+        except (OSError, ValueError) as e:
+            sys.exit(f"Errore nel dark: {e}")
+    if args.png:
+        os.makedirs(args.png, exist_ok=True)
+    opts = dict(dark=dark, smooth=args.smooth, max_peaks=args.max_peaks,
+                png=os.path.abspath(args.png) if args.png else None)
+
+    paths = find_csv(args.root)
+    if not paths:
+        sys.exit(f"Nessun CSV in {args.root}")
+    digests = [file_sha1(p) for p in paths]
+    if args.scaling:
+        print(f"{len(paths)} file, blocchi da {args.chunk}, {os.cpu_count()} core")
+        scaling([(p, d, opts) for p, d in zip(paths, digests)], args.chunk,
+                max(1, args.jobs))
+        sys.exit()
+
+    cache = ResultCache(args.root, opts)
+    rows, jobs = [], []
+    for p, d in zip(paths, digests):
+        hit = None if args.force else cache.get(d)
+        if hit and (not opts["png"] or os.path.exists(os.path.join(
+                opts["png"], os.path.splitext(os.path.basename(p))[0] + "_batch.png"))):
+            rows.append(dict(hit, path=p))
+        else:
+            jobs.append((p, d, opts))
+    t0 = time.perf_counter()
+    for row in run(jobs, args.jobs, args.chunk):
+        cache.put(row)
+        rows.append(row)
+        if row["error"]:
+            print(f"Saltato {row['path']}: {row['error']}")
+    dt_s = time.perf_counter() - t0
+    cache.save()
+    rows.sort(key=lambda r: r["path"])
+    write_columns(args.output, rows, args.max_peaks)
+    rate = f", {len(jobs) / dt_s:.1f} file/s" if jobs and dt_s > 0 else ""
+    print(f"{len(paths)} file: {len(jobs)} elaborati su {args.jobs} processi"
+          f" ({len(paths) - len(jobs)} dalla cache){rate} → {args.output}")
@@ -0,0 +1,193 @@
+# specbench.py
+"""
+Benchmark della catena acquisizione → elaborazione → rendering → export con
+spettri sintetici (specsim.py) a 2048 px (USB2000) e 3648 px (USB4000).
+
+Per ogni stadio: frame/s, latenza p50/p99 e memoria allocata per frame
+(picco tracemalloc). I risultati vanno in JSON per confrontare versioni:
+
+    python specbench.py -o bench_nuovo.json
+    python specbench.py -o bench_nuovo.json --compare bench_vecchio.json
+    python specbench.py --quick --only boxcar,ccd_strip
+Dipendenze: numpy, pyqtgraph (Qt offscreen)
+"""
+
+import os, json, time, platform, tempfile, argparse, subprocess, tracemalloc
+import numpy as np
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+INTEG_MS = 10                     # integrazione di speclive2-4: budget per frame
+PIXELS = (2048, 3648)
+
+# ---------- misura --------------------------------------------------------
+
+def measure(fn, n_iter: int, n_alloc: int = 20) -> dict:
+    """Latenze per chiamata (ns) e picco di memoria allocata per chiamata."""
+    for _ in range(min(10, n_iter)):              # riscaldamento
+        fn()
+    lat = np.empty(n_iter)
+    for i in range(n_iter):
+        t0 = time.perf_counter_ns()
+        fn()
+        lat[i] = time.perf_counter_ns() - t0
+
+    tracemalloc.start()
+    peak = 0
+    for _ in range(n_alloc):
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        fn()
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - base)
+    tracemalloc.stop()
+
+    lat /= 1000                                   # µs
+    return dict(n_iter=n_iter, fps=1e6 / lat.mean(),
+                p50_us=float(np.percentile(lat, 50)),
+                p99_us=float(np.percentile(lat, 99)),
+                alloc_kb=peak / 1024)
+
+# ---------- stadi ---------------------------------------------------------
+
+def stages(n_px: int, frames: np.ndarray, wl: np.ndarray, tmp: str):
+    """
+    Dizionario nome → callable senza argomenti che elabora un frame, più le
+    risorse da tenere vive (widget Qt) e il Recorder da chiudere.
+    repaint_* misurano setData + ridisegno di un grafico 900 px, con tutti i
+    punti o decimato min/max con EnvelopeCurve di specdecim.py.
+    """
+    import pyqtgraph as pg
+    from pyqtgraph.Qt import QtWidgets
+    from specsmooth import Smoother
+    from specccd import CCDStrip, strip_legacy, rgb_table
+    from specavg import Averager
+    from specrec import Recorder
+    from specdecim import EnvelopeCurve
+    from specwfall import Waterfall, view_box
+
+    it = iter(range(1 << 62))
+    def frame():
+        return frames[next(it) % len(frames)]
+
+    base_rgb = rgb_table(wl, cache_dir=None)
+    glw = pg.GraphicsLayoutWidget(); glw.resize(900, 600)
+    plot = glw.addPlot(row=0, col=0)
+    curve = plot.plot(pen=pg.mkPen(width=2))
+    vb = glw.addViewBox(row=1, col=0)
+    item = pg.ImageItem(axisOrder='row-major'); vb.addItem(item)
+    strip = CCDStrip(item, vb, wl, base_rgb)
+    wfall = Waterfall(wl, 600, levels=(0, float(frames.max())))
+    glw.addItem(view_box(wfall), row=2, col=0)
+    avg = Averager(n_px, 10, "block")
+    smooth = Smoother("boxcar", 1)
+    k_legacy = np.ones(3) / 3
+    # ridisegno completo del grafico (grab forza il paint offscreen)
+    pw_full, pw_env = pg.PlotWidget(), pg.PlotWidget()
+    for pw in (pw_full, pw_env):
+        pw.resize(900, 400); pw.show()
+    full = pw_full.plot(pen=pg.mkPen(width=2))
+    env = EnvelopeCurve(pw_env, pen=pg.mkPen(width=2))
+    for c in (full, env):
+        c.setData(wl, frames[0])
+    QtWidgets.QApplication.processEvents()
+    rec = Recorder(os.path.join(tmp, f"bench_{n_px}.usbspec"), wl)
+    csv = os.path.join(tmp, f"bench_{n_px}.csv")
+
+    def savetxt():
+        np.savetxt(csv, np.column_stack([wl, frame()]), delimiter=",",
+                   header="wavelength_nm,intensity_counts", comments='')
+
+    return {
+        "boxcar_legacy": lambda: np.convolve(frame(), k_legacy, "same"),
+        "boxcar":       lambda: smooth(frame()),
+        "ccd_legacy":   lambda: strip_legacy(base_rgb, frame()),
+        "ccd_strip":    lambda: strip.update(frame()),
+        "waterfall_row": lambda: wfall.add(frame()),
+        "curve_setData": lambda: curve.setData(wl, frame()),
+        "curve_envelope": lambda: env.setData(wl, frame()),
+        "repaint_full": lambda: (full.setData(wl, frame()), pw_full.grab()),
+        "repaint_envelope": lambda: (env.setData(wl, frame()), pw_env.grab()),
+        "average_block": lambda: avg.add(frame()),
+        "export_savetxt": savetxt,
+        "export_record": lambda: rec.write(frame()),
+    }, (glw, pw_full, pw_env), rec
+
+def synthetic(n_px: int, n: int = 64):
+    """n frame sintetici dal simulatore, senza attese di integrazione."""
+    from specsim import SimSpectrometer
+    model = "USB4000" if n_px > 2048 else "USB2000"
+    sim = SimSpectrometer(model, n_pixels=n_px, seed=0, realtime=False)
+    sim.integration_time_micros(INTEG_MS * 1000)
+    frames = np.empty((n, n_px))
+    for i in range(n):
+        frames[i] = sim.intensities(correct_dark_counts=True)
+    return sim.wavelengths(), frames
+
+# ---------- confronto -----------------------------------------------------
+
+def compare(new: dict, old: dict):
+    key = lambda r: (r["name"], r["n_pixels"])
+    ref = {key(r): r for r in old["results"]}
+    print(f"\nconfronto con {old['meta'].get('git', '?')}  (p50, <1 = più veloce)")
+    for r in new["results"]:
+        o = ref.get(key(r))
+        if o:
+            print(f"  {r['name']:16s} {r['n_pixels']:5d} px  "
+                  f"{o['p50_us']:9.1f} → {r['p50_us']:9.1f} µs  ×{r['p50_us'] / o['p50_us']:.2f}")
+
+def meta() -> dict:
+    try:
+        git = subprocess.run(["git", "describe", "--always", "--dirty"],
+                             capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        git = ""
+    return dict(git=git, date=time.strftime("%Y-%m-%d %H:%M:%S"),
+                python=platform.python_version(), numpy=np.__version__,
+                machine=platform.machine(), cpu_count=os.cpu_count(), integ_ms=INTEG_MS)
+
+# --------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmark della pipeline USB2000/4000")
+    ap.add_argument("-o", "--output", default="bench.json")
+    ap.add_argument("--compare", metavar="JSON", help="risultati precedenti da confrontare")
+    ap.add_argument("--only", help="stadi da misurare, separati da virgola")
+    ap.add_argument("--quick", action="store_true", help="meno iterazioni")
+    args = ap.parse_args()
+
+    from pyqtgraph.Qt import QtWidgets
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    only = set(args.only.split(",")) if args.only else None
+    n_iter = 100 if args.quick else 1000
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_px in PIXELS:
+            wl, frames = synthetic(n_px)
+            fns, keep, rec = stages(n_px, frames, wl, tmp)
+            print(f"\n{n_px} px  (budget {INTEG_MS} ms/frame = {1000 / INTEG_MS:.0f} fps)")
+            for name, fn in fns.items():
+                if only and name not in only:
+                    continue
+                n = max(10, n_iter // 10) if name in ("export_savetxt", "repaint_full",
+                                                     "repaint_envelope") else n_iter
+                r = dict(name=name, n_pixels=n_px, **measure(fn, n))
+                results.append(r)
+                print(f"  {name:16s} {r['fps']:10.0f} fr/s  p50 {r['p50_us']:8.1f} µs"
+                      f"  p99 {r['p99_us']:8.1f} µs  alloc {r['alloc_kb']:8.1f} kB")
+            rec.close()
+
+            live = [r["p50_us"] for r in results if r["n_pixels"] == n_px
+                    and r["name"] in ("boxcar", "ccd_strip", "curve_setData")]
+            if len(live) == 3:
+                print(f"  percorso live (boxcar+ccd+setData): {sum(live):.0f} µs/frame"
+                      f" = {100 * sum(live) / (INTEG_MS * 1000):.1f}% del budget")
+
+    out = dict(meta=meta(), results=results)
+    with open(args.output, "w") as f:
+        json.dump(out, f, indent=1)
+    print(f"\nRisultati in {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(out, json.load(f))
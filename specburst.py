@@ -0,0 +1,160 @@
+# specburst.py
+"""
+Acquisizione a raffica per cinetiche: n frame (o una durata) letti uno dopo
+l'altro al limite del tempo di integrazione, senza disegnare nulla.
+
+I frame vanno in un buffer preallocato con il dtype dei record .usbspec:
+`counts` è la vista (n, pixel), i timestamp sono time.perf_counter_ns()
+presi appena la lettura ritorna. Alla fine il buffer viene scritto con una
+sola scrittura (specrec.write_recording) e può essere mostrato come
+waterfall (λ × tempo).
+
+    python specburst.py -n 1000 --integ-ms 10 -o cinetica.usbspec [--sim] [--show]
+    python specburst.py --duration 5 --integ-ms 3
+
+Nei viewer la raffica si aggancia ad AcqWorker.sinks (vedi speclive2.py, K).
+Dipendenze: numpy (pyqtgraph solo per il waterfall)
+"""
+
+import sys, math, time, argparse
+import numpy as np
+from specrec import frame_dtype, write_recording
+
+# ---------- buffer della raffica ------------------------------------------
+
+class Burst:
+    def __init__(self, n_pixels: int, n_frames: int = None, duration_s: float = None,
+                 integ_ms: float = None):
+        if n_frames is None:
+            if not (duration_s and integ_ms):
+                raise ValueError("serve n_frames oppure duration_s e integ_ms")
+            n_frames = math.ceil(duration_s * 1000 / integ_ms) + 1
+        self.duration_ns = int(duration_s * 1e9) if duration_s else None
+        self.integ_ms = integ_ms
+        self.records = np.zeros(n_frames, dtype=frame_dtype(n_pixels))
+        self.counts = self.records["counts"]          # vista (n, pixel)
+        self.t_ns = np.zeros(n_frames, dtype=np.int64)
+        self.n = 0
+        self.t0_epoch = None
+        self.done = False
+
+    def __call__(self, counts: np.ndarray, t: float = None):
+        """Aggiunge un frame (firma dei sink di AcqWorker); ignorato a raffica finita."""
+        if self.done:
+            return
+        t_ns = time.perf_counter_ns()
+        if self.n == 0:
+            self.t0_epoch = time.time()
+        self.counts[self.n] = counts
+        self.t_ns[self.n] = t_ns
+        self.n += 1
+        if (self.n == len(self.records) or
+                (self.duration_ns and t_ns - self.t_ns[0] >= self.duration_ns)):
+            self.done = True
+
+    # ------------------------------------------------------------------
+    def times(self) -> np.ndarray:
+        """Secondi dal primo frame."""
+        return (self.t_ns[:self.n] - self.t_ns[0]) / 1e9
+
+    def stats(self) -> dict:
+        """Frequenza ottenuta, intervallo medio e jitter, frame mancati (buchi > 1,5 intervalli)."""
+        if self.n < 2:
+            return dict(n=self.n, fps=0.0, dt_ms=0.0, jitter_ms=0.0, gaps=0)
+        dt = np.diff(self.t_ns[:self.n]) / 1e6
+        step = np.median(dt)
+        return dict(n=self.n, fps=1000 / dt.mean(), dt_ms=float(dt.mean()),
+                    jitter_ms=float(dt.std()), gaps=int(np.sum(dt > 1.5 * step)))
+
+    def summary(self) -> str:
+        s = self.stats()
+        limit = f"/{1000 / self.integ_ms:.0f}" if self.integ_ms else ""
+        return (f"{s['n']} frame, {s['fps']:.1f}{limit} fps, "
+                f"Δt {s['dt_ms']:.2f} ± {s['jitter_ms']:.2f} ms, buchi {s['gaps']}")
+
+    def save(self, path: str, wl: np.ndarray, **meta) -> str:
+        """Una sola scrittura: header + λ + tutti i record."""
+        rec = self.records[:self.n]
+        rec["t"] = self.t_ns[:self.n] / 1e9
+        write_recording(path, wl, rec, clock="perf_counter", integ_ms=self.integ_ms,
+                        t0_epoch=self.t0_epoch, t0_mono=self.t_ns[0] / 1e9, **meta)
+        return path
+
+# ---------- acquisizione diretta ------------------------------------------
+
+def acquire(spec, burst: Burst, dark_correct: bool = True) -> Burst:
+    """Legge dallo spettrometro finché la raffica non è completa (nessun thread)."""
+    while not burst.done:
+        burst(spec.intensities(correct_dark_counts=dark_correct))
+    return burst
+
+# ---------- waterfall -----------------------------------------------------
+
+def waterfall(burst: Burst, wl: np.ndarray, title: str = "Cinetica"):
+    """Finestra con i frame come immagine: x = λ, y = tempo dal primo frame (s)."""
+    import pyqtgraph as pg
+    from pyqtgraph.Qt import QtCore
+
+    win = pg.GraphicsLayoutWidget(title=title)
+    win.resize(900, 600)
+    plot = win.addPlot()
+    plot.setLabel('bottom', "Lunghezza d'onda (nm)")
+    plot.setLabel('left', "Tempo (s)")
+    plot.setTitle(f"{title}: {burst.summary()}")
+    img = pg.ImageItem(axisOrder='row-major')
+    img.setLookupTable(pg.colormap.get("viridis").getLookupTable(nPts=256))
+    img.setImage(burst.counts[:burst.n])
+    t_end = burst.times()[-1] if burst.n > 1 else 1.0
+    img.setRect(QtCore.QRectF(wl[0], 0, wl[-1] - wl[0], t_end))
+    plot.addItem(img)
+    plot.invertY(True)                            # tempo che scorre verso il basso
+    win.addItem(pg.HistogramLUTItem(image=img))
+    return win
+
+# --------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from specdev import open_spectrometer
+    from seabreeze._exc import SeaBreezeError
+
+    ap = argparse.ArgumentParser(description="Acquisizione a raffica (cinetiche)")
+    ap.add_argument("-n", "--frames", type=int, help="numero di frame")
+    ap.add_argument("-d", "--duration", type=float, help="durata in secondi")
+    ap.add_argument("--integ-ms", type=float, default=10)
+    ap.add_argument("-o", "--output", help="file .usbspec (predefinito: kinetics_<data>.usbspec)")
+    ap.add_argument("--show", action="store_true", help="mostra il waterfall")
+    ap.add_argument("--sim", nargs="?", const="1", metavar="CONFIG",
+                    help="usa lo spettrometro simulato (vedi specsim.py)")
+    args = ap.parse_args()
+    if not (args.frames or args.duration):
+        ap.error("indicare -n o --duration")
+
+    try:
+        spec = open_spectrometer(sim=args.sim)
+    except (SeaBreezeError, OSError) as e:
+        sys.exit(f"Errore: nessuno spettrometro trovato ({e}).")
+    spec.integration_time_micros(int(args.integ_ms * 1000))
+    wl = spec.wavelengths()
+    burst = Burst(len(wl), args.frames, args.duration, args.integ_ms)
+    print(f"{spec.model}  S/N: {spec.serial_number}: raffica da "
+          + (f"{args.frames} frame" if args.frames else f"{args.duration} s")
+          + f" a {args.integ_ms} ms…")
+    try:
+        acquire(spec, burst)
+    except (SeaBreezeError, OSError) as e:
+        print(f"Raffica interrotta dopo {burst.n} frame: {e}")
+    finally:
+        spec.close()
+    if burst.n == 0:
+        sys.exit("Nessun frame acquisito.")
+    path = args.output or time.strftime("kinetics_%Y%m%d_%H%M%S.usbspec")
+    burst.save(path, wl, model=spec.model, serial=spec.serial_number)
+    print(burst.summary())
+    print(f"Salvato in {path}")
+
+    if args.show:
+        from pyqtgraph.Qt import QtWidgets
+        app = QtWidgets.QApplication(sys.argv)
+        win = waterfall(burst, wl, f"{spec.model} {spec.serial_number}")
+        win.show()
+        sys.exit(app.exec())
@@ -0,0 +1,156 @@
+# specccd.py
+"""
+Rendering incrementale della "CCD strip" per speclive3.py / speclive4.py.
+
+L'immagine è una sola riga (1 × N × 3, uint8) allungata dalla trasformazione
+dell'ImageItem sull'intervallo spettrale: geometria e range della ViewBox
+vengono impostati una volta sola, ad ogni frame si riscrivono solo i pixel
+nei buffer preallocati (ufunc con `out=`).
+
+La tabella colori base (λ → RGB) è calcolata in modo vettoriale e salvata
+su disco, indicizzata per seriale del dispositivo e hash della calibrazione.
+
+Micro-benchmark (prima/dopo):
+    python specccd.py
+Dipendenze: numpy, pyqtgraph
+"""
+
+import os, time, hashlib
+import numpy as np
+from pyqtgraph.Qt import QtCore
+
+# ---------- colori --------------------------------------------------------
+
+RGB_CACHE_DIR = os.path.expanduser("~/.cache/usb2000-4000/rgb")
+_RGB_VERSION = 1                  # da incrementare se cambiano i segmenti
+_rgb_memo = {}
+
+def wavelength_to_rgb(wl) -> np.ndarray:
+    """
+    (R,G,B)∈[0,1] per 200–1100 nm, vettoriale: scalare → (3,), array → (N,3).
+    Visibile: colore reale. UV/IR: falsi colori.
+    """
+    l = np.asarray(wl, dtype=float)
+    seg = [l < 380, l < 440, l < 490, l < 510, l < 580, l < 645, l < 780]
+    one, zero = np.ones_like(l), np.zeros_like(l)
+    t_uv  = (l - 200) / 180       # UV 200-380 → viola → blu
+    t_ir  = (l - 780) / 320       # IR 780-1100 → rosso → bianco
+    r = np.select(seg, [0.5 * (1 - t_uv), zero, zero, zero,
+                        (l - 510) / 70, one, one], one)
+    g = np.select(seg, [zero, zero, (l - 440) / 50, one,
+                        one, 1 - (l - 580) / 65, zero], t_ir)
+    b = np.select(seg, [one, one, one, 1 - (l - 490) / 20,
+                        zero, zero, zero], t_ir)
+    return np.stack([r, g, b], axis=-1)
+
+def rgb_table(wl: np.ndarray, serial: str = "", cache_dir: str = RGB_CACHE_DIR) -> np.ndarray:
+    """
+    Tabella (N,3) per l'asse `wl`, dalla cache in memoria o su disco se
+    esiste per questo seriale e questa calibrazione; altrimenti la calcola
+    e la salva. Con cache_dir=None non si usa il disco.
+    """
+    wl = np.ascontiguousarray(wl, dtype=float)
+    digest = hashlib.sha1(wl.tobytes()).hexdigest()[:16]
+    key = f"{serial or 'nodev'}_{digest}_v{_RGB_VERSION}"
+    if key in _rgb_memo:
+        return _rgb_memo[key]
+
+    path = os.path.join(cache_dir, key + ".npy") if cache_dir else None
+    table = None
+    if path and os.path.exists(path):
+        try:
+            table = np.load(path)
+            if table.shape != (len(wl), 3):
+                table = None
+        except (OSError, ValueError):
+            table = None
+    if table is None:
+        table = wavelength_to_rgb(wl)
+        if path:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                np.save(path, table)
+            except OSError as e:          # cache non scrivibile: si prosegue
+                print("Cache RGB non salvata:", e)
+    _rgb_memo[key] = table
+    return table
+
+# ---------- renderer ------------------------------------------------------
+
+class CCDStrip:
+    def __init__(self, img_item, view_box, wl: np.ndarray, base_rgb: np.ndarray):
+        self.img_item = img_item
+        self.view_box = view_box
+        self.set_wavelengths(wl, base_rgb)
+
+    def set_wavelengths(self, wl: np.ndarray, base_rgb: np.ndarray):
+        """(Ri)alloca i buffer e fissa la geometria; solo se cambia la calibrazione."""
+        n = len(wl)
+        self.base = np.asarray(base_rgb, dtype=np.float32) * 255   # già in 0…255
+        self._norm = np.empty(n, dtype=np.float32)
+        self._f = np.empty((n, 3), dtype=np.float32)
+        self.img = np.zeros((1, n, 3), dtype=np.uint8)
+        self.img_item.setImage(self.img, autoLevels=False, levels=(0, 255))
+        self.img_item.resetTransform()
+        self.img_item.setRect(QtCore.QRectF(wl[0], 0, wl[-1] - wl[0], 1))
+        self.view_box.setYRange(0, 1, padding=0)
+        self.view_box.setXRange(wl[0], wl[-1], padding=0)
+
+    def render(self, counts: np.ndarray) -> np.ndarray:
+        """Calcola la riga RGB nei buffer preallocati (nessuna chiamata Qt)."""
+        peak = counts.max()
+        scale = 1.0 / peak if peak else 1.0
+        np.multiply(counts, scale, out=self._norm)
+        np.multiply(self.base, self._norm[:, None], out=self._f)
+        np.clip(self._f, 0, 255, out=self._f)
+        np.copyto(self.img[0], self._f, casting="unsafe")
+        return self.img
+
+    def update(self, counts: np.ndarray):
+        """Aggiorna i pixel della strip; la geometria resta invariata."""
+        self.img_item.setImage(self.render(counts), autoLevels=False)
+
+# ---------- versione originale (per confronto) ----------------------------
+
+def strip_legacy(base_rgb: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Costruzione per-frame usata in origine: 50 righe, allocazioni ad ogni frame."""
+    norm = counts / counts.max() if counts.max() else counts
+    rgb_line = (base_rgb * norm[:, None]).clip(0, 1)
+    return np.tile((rgb_line * 255).astype(np.uint8)[None, :, :], (50, 1, 1))
+
+# ---------- micro-benchmark -----------------------------------------------
+
+def _bench(fn, n_iter):
+    t0 = time.perf_counter()
+    for _ in range(n_iter):
+        fn()
+    return (time.perf_counter() - t0) / n_iter * 1e6       # µs per frame
+
+if __name__ == "__main__":
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    import pyqtgraph as pg
+    from pyqtgraph.Qt import QtWidgets
+
+    app = QtWidgets.QApplication([])
+    n_iter = 500
+    for n_px in (2048, 3648):                    # USB2000, USB4000
+        wl = np.linspace(200, 1100, n_px)
+        base_rgb = np.random.rand(n_px, 3)
+        counts = 4000 * np.random.rand(n_px)
+
+        glw = pg.GraphicsLayoutWidget()
+        vb = glw.addViewBox()
+        item = pg.ImageItem(axisOrder='row-major'); vb.addItem(item)
+        strip = CCDStrip(item, vb, wl, base_rgb)
+
+        def legacy_qt():
+            img = strip_legacy(base_rgb, counts)
+            item.setImage(img, autoLevels=False); item.resetTransform()
+            item.setRect(QtCore.QRectF(wl[0], 0, wl[-1] - wl[0], 1))
+            vb.setYRange(0, 1, padding=0); vb.setXRange(wl[0], wl[-1], padding=0)
+
+        print(f"{n_px} px")
+        print(f"  array  prima {_bench(lambda: strip_legacy(base_rgb, counts), n_iter):8.1f} µs"
+              f"   dopo {_bench(lambda: strip.render(counts), n_iter):8.1f} µs")
+        print(f"  + Qt   prima {_bench(legacy_qt, n_iter):8.1f} µs"
+              f"   dopo {_bench(lambda: strip.update(counts), n_iter):8.1f} µs")
@@ -0,0 +1,289 @@
+# specd.py
+"""
+Servizio di acquisizione senza GUI: possiede lo spettrometro e pubblica ogni
+frame su un socket locale (Unix domain o TCP loopback). Più client (viewer,
+registrazione, analisi) possono collegarsi contemporaneamente.
+
+Protocollo:
+    client → server   una riga JSON di iscrizione, es.
+                      {"policy": "oldest", "depth": 8}
+                      poi, facoltative, righe di controllo {"integ_us": 20000}
+    server → client   "USBSTRM1" + uint32 lunghezza + header JSON + λ float64[n]
+                      poi record a dimensione fissa:
+                      seq uint64 | t float64 (monotonic) | counts float32[n]
+
+Ogni record viene serializzato una volta e inviato identico a tutti i client.
+Ogni client ha una coda limitata (`depth`); quando è piena si scarta il frame
+più vecchio ("oldest", adatto ai viewer) o quello nuovo ("newest"). I buchi
+nella sequenza `seq` mostrano al client quanti frame ha perso.
+
+Avvio:
+    python specd.py [--addr unix:/tmp/usb2000.sock | tcp:127.0.0.1:5555] [--integ-ms 10] [--sim]
+I viewer usano il servizio se USB2000_DAEMON contiene l'indirizzo (vedi specdev.py).
+Dipendenze: numpy, seabreeze
+"""
+
+import os, sys, json, socket, struct, argparse, threading, collections
+import numpy as np
+from specacq import FrameRing, AcqWorker
+
+MAGIC = b"USBSTRM1"
+DEFAULT_ADDR = "unix:/tmp/usb2000.sock" if hasattr(socket, "AF_UNIX") else "tcp:127.0.0.1:5555"
+POLICIES = ("oldest", "newest")
+REC_HEAD = struct.Struct("<Qd")          # seq, t
+
+def _socket(addr: str):
+    """'unix:/percorso' o 'tcp:host:porta' → (socket, indirizzo)."""
+    kind, _, where = addr.partition(":")
+    if kind == "unix":
+        return socket.socket(socket.AF_UNIX, socket.SOCK_STREAM), where
+    if kind == "tcp":
+        host, _, port = where.rpartition(":")
+        return socket.socket(socket.AF_INET, socket.SOCK_STREAM), (host, int(port))
+    raise ValueError(f"indirizzo non valido: {addr!r} (unix:… o tcp:host:porta)")
+
+# ---------- server --------------------------------------------------------
+
+class _Client:
+    """Coda limitata + thread di invio per un singolo iscritto."""
+
+    def __init__(self, conn, policy: str, depth: int):
+        self.conn = conn
+        self.policy = policy
+        self.queue = collections.deque()
+        self.depth = max(1, depth)
+        self.dropped = 0
+        self.alive = True
+        self._cv = threading.Condition()
+
+    def offer(self, rec: bytes):
+        with self._cv:
+            if len(self.queue) >= self.depth:
+                self.dropped += 1
+                if self.policy == "newest":
+                    return
+                self.queue.popleft()
+            self.queue.append(rec)
+            self._cv.notify()
+
+    def send_loop(self):
+        try:
+            while self.alive:
+                with self._cv:
+                    while not self.queue and self.alive:
+                        self._cv.wait(0.5)
+                    if not self.alive:
+                        break
+                    rec = self.queue.popleft()
+                self.conn.sendall(rec)
+        except OSError:
+            pass
+        self.close()
+
+    def close(self):
+        with self._cv:
+            self.alive = False
+            self._cv.notify()
+        try:
+            self.conn.close()
+        except OSError:
+            pass
+
+class SpecServer:
+    def __init__(self, spec, addr: str = DEFAULT_ADDR, integ_ms: float = 10):
+        self.spec = spec
+        self.addr = addr
+        spec.integration_time_micros(int(integ_ms * 1000))
+        self.wl = np.asarray(spec.wavelengths(), dtype="<f8")
+        self.ring = FrameRing(8, len(self.wl))
+        self.worker = AcqWorker(spec, self.ring, integ_ms)
+        self.worker.sinks = [self._broadcast]
+        self.clients = []
+        self.seq = 0
+        self._lock = threading.Lock()
+        self._sock, where = _socket(addr)
+        if isinstance(where, str) and os.path.exists(where):
+            os.unlink(where)                  # socket rimasto da un'esecuzione precedente
+        if not isinstance(where, str):
+            self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind(where)
+        self._sock.listen()
+        self._where = where
+
+    def hello(self) -> bytes:
+        header = dict(model=self.spec.model, serial=self.spec.serial_number,
+                      max_intensity=getattr(self.spec, "max_intensity", None),
+                      integ_ms=self.worker.integ_ms, n_pixels=len(self.wl),
+                      counts_dtype="<f4", record_size=REC_HEAD.size + 4 * len(self.wl))
+        hdr = json.dumps(header).encode()
+        return MAGIC + struct.pack("<I", len(hdr)) + hdr + self.wl.tobytes()
+
+    def _broadcast(self, counts, t):
+        """Sink dell'AcqWorker: serializza una volta, accoda a tutti."""
+        rec = REC_HEAD.pack(self.seq, t) + np.asarray(counts, dtype="<f4").tobytes()
+        self.seq += 1
+        with self._lock:
+            clients = [c for c in self.clients if c.alive]
+            self.clients = clients
+        for c in clients:
+            c.offer(rec)
+
+    def _handle(self, conn):
+        """Legge l'iscrizione, invia l'header, poi ascolta i comandi."""
+        f = conn.makefile("rb")
+        try:
+            conn.settimeout(2.0)
+            sub = json.loads(f.readline() or b"{}")
+            conn.settimeout(None)
+            policy = sub.get("policy", "oldest")
+            if policy not in POLICIES:
+                policy = "oldest"
+            client = _Client(conn, policy, int(sub.get("depth", 8)))
+            conn.sendall(self.hello())
+            # buffer del kernel piccolo: la coda per-client resta quella che conta
+            rec_size = REC_HEAD.size + 4 * len(self.wl)
+            conn.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 2 * rec_size)
+        except (OSError, ValueError) as e:
+            print("Iscrizione non valida:", e)
+            conn.close()
+            return
+        with self._lock:
+            self.clients.append(client)
+        threading.Thread(target=client.send_loop, daemon=True).start()
+        print(f"Client collegato ({policy}, coda {client.depth}); totale {len(self.clients)}")
+
+        try:
+            for line in f:                    # comandi finché il client è collegato
+                try:
+                    cmd = json.loads(line)
+                except ValueError:
+                    continue
+                if "integ_us" in cmd:
+                    self.worker.set_integration(int(cmd["integ_us"]))
+        except OSError:
+            pass
+        client.close()
+        print(f"Client scollegato, frame scartati: {client.dropped}")
+
+    def serve_forever(self):
+        self.worker.start()
+        print(f"In ascolto su {self.addr}")
+        try:
+            while True:
+                conn, _ = self._sock.accept()
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+        except OSError:
+            pass                              # socket chiuso da close()
+
+    def close(self):
+        self.worker.stop()
+        try:
+            self._sock.close()
+        except OSError:
+            pass
+        for c in list(self.clients):
+            c.close()
+        if isinstance(self._where, str) and os.path.exists(self._where):
+            os.unlink(self._where)
+
+# ---------- client --------------------------------------------------------
+
+class SpecClient:
+    """
+    Iscritto al servizio. Espone la stessa interfaccia di
+    seabreeze Spectrometer usata negli script (model, serial_number,
+    wavelengths(), intensities(), integration_time_micros(), close()),
+    quindi AcqWorker e i viewer funzionano senza modifiche.
+    """
+
+    def __init__(self, addr: str = DEFAULT_ADDR, policy: str = "oldest", depth: int = 4):
+        self.sock, where = _socket(addr)
+        self.sock.connect(where)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 64 * 1024)
+        self.sock.sendall(json.dumps({"policy": policy, "depth": depth}).encode() + b"\n")
+        head = self._read(len(MAGIC) + 4)
+        if head[:len(MAGIC)] != MAGIC:
+            raise OSError(f"{addr}: risposta non valida dal servizio")
+        (n,) = struct.unpack("<I", head[len(MAGIC):])
+        self.header = json.loads(self._read(n))
+        n_px = self.header["n_pixels"]
+        self.wl = np.frombuffer(self._read(8 * n_px), dtype="<f8")
+        self.model = self.header["model"]
+        self.serial_number = self.header["serial"]
+        self.max_intensity = self.header.get("max_intensity")
+        self._buf = bytearray(self.header["record_size"])
+        self._view = memoryview(self._buf)
+        self._counts = np.frombuffer(self._buf, dtype="<f4", offset=REC_HEAD.size)
+        self.seq = -1
+        self.missed = 0                       # frame persi (buchi in seq)
+
+    def _read(self, n: int) -> bytes:
+        buf = bytearray(n)
+        self._fill(memoryview(buf))
+        return bytes(buf)
+
+    def _fill(self, view):
+        got = 0
+        while got < len(view):
+            k = self.sock.recv_into(view[got:])
+            if k == 0:
+                raise OSError("connessione chiusa dal servizio")
+            got += k
+
+    def recv(self):
+        """
+        Riceve il frame successivo nel buffer interno (nessuna copia):
+        restituisce (seq, t, counts); counts è valido fino alla prossima recv.
+        """
+        self._fill(self._view)
+        seq, t = REC_HEAD.unpack_from(self._buf)
+        if self.seq >= 0 and seq > self.seq + 1:
+            self.missed += seq - self.seq - 1
+        self.seq = seq
+        return seq, t, self._counts
+
+    # ---- interfaccia tipo seabreeze -----------------------------------
+    def wavelengths(self):
+        return self.wl.copy()
+
+    def intensities(self, correct_dark_counts: bool = True):
+        # la correzione dark è quella scelta dal servizio
+        return self.recv()[2].astype(float)
+
+    def integration_time_micros(self, us: int):
+        """Chiede al servizio di cambiare integrazione (vale per tutti i client)."""
+        self.sock.sendall(json.dumps({"integ_us": int(us)}).encode() + b"\n")
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+# --------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from specdev import open_spectrometer
+    from seabreeze._exc import SeaBreezeError
+
+    ap = argparse.ArgumentParser(description="Servizio di acquisizione USB2000/4000")
+    ap.add_argument("--addr", default=DEFAULT_ADDR)
+    ap.add_argument("--integ-ms", type=float, default=10)
+    ap.add_argument("--sim", nargs="?", const="1", metavar="CONFIG",
+                    help="usa lo spettrometro simulato (vedi specsim.py)")
+    args = ap.parse_args()
+
+    try:
+        spec = open_spectrometer(daemon=False, sim=args.sim)
+    except (SeaBreezeError, OSError) as e:
+        sys.exit(f"Errore: nessuno spettrometro trovato ({e}).")
+    print(f"Trovato: {spec.model}  S/N: {spec.serial_number}")
+
+    server = SpecServer(spec, args.addr, args.integ_ms)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        spec.close()
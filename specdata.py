@@ -0,0 +1,232 @@
+# specdata.py
+"""
+Caricamento veloce di archivi di spettri (cartelle usb2000_YYYYMMDD_HHMMSS/
+con CSV e registrazioni .usbspec).
+
+La prima scansione di una cartella legge ogni CSV una volta sola, lo converte
+in un .npy mappabile in memoria nella cache (<root>/.speccache/) e scrive un
+indice persistente (timestamp, percorso, dispositivo, pixel, min/max). Le
+scansioni successive rileggono solo i file nuovi o modificati.
+
+I dati sono esposti come vista "pigra" (n_frame, n_pixel): solo le righe
+effettivamente indicizzate vengono lette dal disco.
+
+    ds = Dataset.open("examples/data")
+    v  = ds.frames(n_pixels=2048)      # nessuna lettura
+    v[-10:]                            # legge solo gli ultimi 10 spettri
+
+Riepilogo da terminale:
+    python specdata.py examples/data
+Dipendenze: numpy
+"""
+
+import os, re, sys, json, hashlib
+import datetime as dt
+import numpy as np
+from specrec import EXT, open_recording
+
+CACHE = ".speccache"
+INDEX = "index.json"
+_STAMP = re.compile(r"(\d{8}_\d{6})")
+
+# ---------- indice --------------------------------------------------------
+
+def _stamp_time(path: str, default: float) -> float:
+    """Timestamp dal nome (…_YYYYMMDD_HHMMSS…), altrimenti `default`."""
+    m = _STAMP.search(os.path.basename(path))
+    if m:
+        try:
+            return dt.datetime.strptime(m.group(1), "%Y%m%d_%H%M%S").timestamp()
+        except ValueError:
+            pass
+    return default
+
+def _device(path: str) -> str:
+    """Modello dal prefisso del nome file (usb2000_…, usb4000_…)."""
+    name = os.path.basename(path)
+    return name.split("_", 1)[0].upper() if "_" in name else ""
+
+class Dataset:
+    def __init__(self, root: str, entries: list):
+        self.root = root
+        self.cache_dir = os.path.join(root, CACHE)
+        self.entries = entries                   # una voce per file sorgente
+        self._wl = {}
+
+    # ------------------------------------------------------------------
+    @classmethod
+    def open(cls, root: str, rescan: bool = True):
+        """Carica l'indice salvato e, se `rescan`, aggiorna i file cambiati."""
+        cache_dir = os.path.join(root, CACHE)
+        try:
+            with open(os.path.join(cache_dir, INDEX)) as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            entries = []
+        ds = cls(root, entries)
+        if rescan or not entries:
+            ds.scan()
+        return ds
+
+    def scan(self):
+        """Scansiona l'albero; converte solo i file nuovi o modificati."""
+        old = {e["path"]: e for e in self.entries}
+        entries = []
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = sorted(d for d in dirnames if d != CACHE)
+            for name in sorted(filenames):
+                if not (name.endswith(".csv") or name.endswith(EXT)):
+                    continue
+                path = os.path.relpath(os.path.join(dirpath, name), self.root)
+                st = os.stat(os.path.join(self.root, path))
+                e = old.get(path)
+                if e is None or e["mtime"] != st.st_mtime or e["size"] != st.st_size:
+                    try:
+                        e = self._index_file(path, st)
+                    except (OSError, ValueError) as err:
+                        print(f"Saltato {path}: {err}")
+                        continue
+                entries.append(e)
+        entries.sort(key=lambda e: e["t"])
+        self.entries = entries
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(os.path.join(self.cache_dir, INDEX), "w") as f:
+            json.dump(entries, f, indent=1)
+
+    def _index_file(self, path: str, st) -> dict:
+        full = os.path.join(self.root, path)
+        e = dict(path=path, mtime=st.st_mtime, size=st.st_size)
+        if path.endswith(EXT):
+            header, wl, frames = open_recording(full)
+            counts = frames["counts"]
+            t0 = header["t0_epoch"] - header["t0_mono"]
+            e.update(kind="rec", device=header.get("model", ""),
+                     serial=header.get("serial", ""), n_frames=len(frames),
+                     t=t0 + float(frames["t"][0]) if len(frames) else header["t0_epoch"],
+                     min=float(counts.min()) if len(frames) else 0.0,
+                     max=float(counts.max()) if len(frames) else 0.0, cache=None)
+        else:
+            data = np.loadtxt(full, delimiter=",", skiprows=1, ndmin=2)
+            wl, counts = data[:, 0], data[:, 1]
+            key = hashlib.sha1(path.encode()).hexdigest()[:16]
+            os.makedirs(self.cache_dir, exist_ok=True)
+            np.save(os.path.join(self.cache_dir, key + ".npy"), counts)
+            e.update(kind="csv", device=_device(path), serial="", n_frames=1,
+                     t=_stamp_time(path, st.st_mtime),
+                     min=float(counts.min()), max=float(counts.max()),
+                     cache=key + ".npy")
+        e["n_pixels"] = len(wl)
+        e["wl"] = self._store_wl(wl)
+        return e
+
+    def _store_wl(self, wl: np.ndarray) -> str:
+        """Salva l'asse λ una volta per calibrazione; restituisce la chiave."""
+        key = "wl_" + hashlib.sha1(np.ascontiguousarray(wl, "<f8").tobytes()).hexdigest()[:16]
+        path = os.path.join(self.cache_dir, key + ".npy")
+        if not os.path.exists(path):
+            os.makedirs(self.cache_dir, exist_ok=True)
+            np.save(path, np.asarray(wl, "<f8"))
+        return key
+
+    # ------------------------------------------------------------------
+    def select(self, device: str = None, n_pixels: int = None,
+               t_min: float = None, t_max: float = None) -> list:
+        """Voci dell'indice che soddisfano i filtri (solo metadati)."""
+        return [e for e in self.entries
+                if (device is None or e["device"] == device)
+                and (n_pixels is None or e["n_pixels"] == n_pixels)
+                and (t_min is None or e["t"] >= t_min)
+                and (t_max is None or e["t"] <= t_max)]
+
+    def frames(self, **filters) -> "SpectraView":
+        """Vista pigra (n_frame, n_pixel) sulle voci selezionate."""
+        return SpectraView(self, self.select(**filters))
+
+    def wavelengths(self, entry: dict) -> np.ndarray:
+        key = entry["wl"]
+        if key not in self._wl:
+            self._wl[key] = np.load(os.path.join(self.cache_dir, key + ".npy"))
+        return self._wl[key]
+
+    def source(self, entry: dict) -> np.ndarray:
+        """Array (n_frame, n_pixel) mappato in memoria per una voce."""
+        if entry["kind"] == "csv":
+            counts = np.load(os.path.join(self.cache_dir, entry["cache"]), mmap_mode="r")
+            return counts[None, :]
+        return open_recording(os.path.join(self.root, entry["path"]))[2]["counts"]
+
+# ---------- vista pigra ---------------------------------------------------
+
+class SpectraView:
+    """
+    Array virtuale (n_frame, n_pixel) concatenato da più sorgenti.
+    L'indicizzazione legge solo le righe richieste.
+    """
+
+    def __init__(self, ds: Dataset, entries: list):
+        px = {e["n_pixels"] for e in entries}
+        if len(px) > 1:
+            raise ValueError(f"numero di pixel diverso tra i file {sorted(px)}: "
+                             "filtra con n_pixels= o device=")
+        self.ds = ds
+        self.entries = entries
+        self.n_pixels = px.pop() if px else 0
+        self._start = np.cumsum([0] + [e["n_frames"] for e in entries])
+        self._src = {}
+
+    @property
+    def shape(self):
+        return (int(self._start[-1]), self.n_pixels)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __array__(self, dtype=None, copy=None):
+        out = self[:]
+        return out.astype(dtype) if dtype is not None else out
+
+    def __getitem__(self, key):
+        cols = slice(None)
+        if isinstance(key, tuple):
+            key, cols = key[0], key[1]
+        scalar = np.ndim(key) == 0 and not isinstance(key, slice)
+        rows = np.arange(len(self))[key]
+        rows = np.atleast_1d(rows)
+        out = np.empty((len(rows), self.n_pixels))
+        which = np.searchsorted(self._start, rows, side="right") - 1
+        for j in np.unique(which):
+            sel = which == j
+            out[sel] = self._source(j)[rows[sel] - self._start[j]]
+        out = out[:, cols]
+        return out[0] if scalar else out
+
+    def _source(self, j: int):
+        if j not in self._src:
+            self._src[j] = self.ds.source(self.entries[j])
+        return self._src[j]
+
+    def times(self) -> np.ndarray:
+        """Timestamp (epoch) di ogni frame; per i CSV quello del nome file."""
+        t = []
+        for e in self.entries:
+            if e["kind"] == "csv":
+                t.append([e["t"]])
+            else:
+                header, _, fr = open_recording(os.path.join(self.ds.root, e["path"]))
+                t.append(header["t0_epoch"] - header["t0_mono"] + fr["t"])
+        return np.concatenate(t) if t else np.zeros(0)
+
+    def wavelengths(self) -> np.ndarray:
+        return self.ds.wavelengths(self.entries[0]) if self.entries else np.zeros(0)
+
+# --------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("Uso: python specdata.py CARTELLA")
+    ds = Dataset.open(sys.argv[1])
+    for e in ds.entries:
+        stamp = dt.datetime.fromtimestamp(e["t"]).strftime("%Y-%m-%d %H:%M:%S")
+        print(f"{stamp}  {e['device']:8s} {e['n_pixels']:5d} px  {e['n_frames']:6d} fr"
+              f"  [{e['min']:9.1f}, {e['max']:9.1f}]  {e['path']}")
+    print(f"{len(ds.entries)} file indicizzati, cache in {ds.cache_dir}")
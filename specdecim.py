@@ -0,0 +1,43 @@
+# specdecim.py
+"""
+Curve live decimate da pyqtgraph stesso: `setDownsampling(auto=True,
+method="peak")` tiene min e max di ogni gruppo di pixel (picchi stretti e
+rumore restano visibili) e `setClipToView(True)` disegna solo l'intervallo
+visibile. Il fattore si adatta a zoom e larghezza della vista con ~5 campioni
+per pixel logico, quindi regge anche gli schermi HiDPI.
+
+In `.x` / `.y` restano i dati a piena risoluzione per cursore ed export.
+
+    self.curve = EnvelopeCurve(self.plot, pen=pg.mkPen(width=2))
+    self.curve.setData(self.wl, counts)
+    self.curve.value_at(550.0)            # conteggi al pixel più vicino
+Dipendenze: numpy, pyqtgraph
+"""
+
+import numpy as np
+
+class EnvelopeCurve:
+    def __init__(self, plot, **kw):
+        """`plot`: PlotItem o PlotWidget; `kw` come per plot.plot()."""
+        self.item = plot.plot(**kw)
+        self.item.setDownsampling(auto=True, method="peak")
+        self.item.setClipToView(True)
+        self.x = self.y = None
+
+    def setData(self, x, y):
+        """Come PlotDataItem.setData(x, y); x crescente."""
+        if self.x is None or x is not self.x:
+            self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.item.setData(self.x, self.y)
+
+    def value_at(self, xpos: float):
+        """y a piena risoluzione nel pixel più vicino a `xpos` (None senza dati)."""
+        if self.y is None:
+            return None
+        i = int(np.clip(np.searchsorted(self.x, xpos), 1, len(self.x) - 1))
+        i -= xpos - self.x[i - 1] < self.x[i] - xpos
+        return float(self.y[i])
+
+    def setVisible(self, visible: bool):
+        self.item.setVisible(visible)
@@ -0,0 +1,74 @@
+# specdev.py
+"""
+Apertura dello spettrometro per tutti gli script, in ordine di priorità:
+
+    1. simulatore (specsim.py) se c'è l'opzione --sim[=config] sulla riga di
+       comando o la variabile USB2000_SIM (es. USB2000_SIM=model=USB4000);
+       più dispositivi simulati si separano con ';' (USB2000;USB4000)
+    2. client di specd.py se USB2000_DAEMON contiene l'indirizzo del servizio
+       (es. "unix:/tmp/usb2000.sock"): i dati sono condivisi con altri client
+    3. primo dispositivo USB trovato da seabreeze
+Dipendenze: seabreeze (solo per il dispositivo reale)
+"""
+
+import os, sys
+
+DAEMON_ENV = "USB2000_DAEMON"
+SIM_ENV = "USB2000_SIM"
+
+def sim_config(argv=None):
+    """Configurazione del simulatore da --sim[=…] o USB2000_SIM, altrimenti None."""
+    for arg in (sys.argv[1:] if argv is None else argv):
+        if arg == "--sim":
+            return "1"
+        if arg.startswith("--sim="):
+            return arg[len("--sim="):]
+    cfg = os.environ.get(SIM_ENV)
+    return cfg if cfg and cfg != "0" else None
+
+def open_spectrometer(daemon: bool = True, sim: str = None):
+    """
+    Restituisce un oggetto con l'interfaccia di seabreeze Spectrometer.
+    Con daemon=False ignora USB2000_DAEMON (usato da specd.py stesso);
+    `sim` forza il simulatore con la configurazione data.
+    Errori: SeaBreezeError (nessun dispositivo) o OSError (servizio assente).
+    """
+    cfg = sim or sim_config()
+    if cfg:
+        from specsim import from_config
+        return from_config(cfg.split(";")[0])
+    addr = os.environ.get(DAEMON_ENV) if daemon else None
+    if addr:
+        from specd import SpecClient
+        return SpecClient(addr)
+    from seabreeze.spectrometers import Spectrometer
+    return Spectrometer.from_first_available()
+
+def open_all(sim: str = None) -> list:
+    """
+    Apre tutti gli spettrometri collegati (o simulati); con il servizio
+    specd.py attivo restituisce il solo client.
+    """
+    cfg = sim or sim_config()
+    if cfg:
+        from specsim import from_config
+        return [from_config(c, serial=f"SIM{i + 1:05d}")
+                for i, c in enumerate(cfg.split(";"))]
+    addr = os.environ.get(DAEMON_ENV)
+    if addr:
+        from specd import SpecClient
+        return [SpecClient(addr)]
+    from seabreeze.spectrometers import Spectrometer, list_devices
+    from seabreeze._exc import SeaBreezeError
+    devices = list_devices()
+    if not devices:
+        raise SeaBreezeError("nessuno spettrometro collegato")
+    specs = []
+    try:
+        for d in devices:
+            specs.append(Spectrometer(d))
+    except SeaBreezeError:
+        for s in specs:
+            s.close()
+        raise
+    return specs
@@ -0,0 +1,111 @@
+# specexport.py
+"""
+Export in background: il thread della GUI prepara solo un'istantanea (copia
+dei conteggi, QImage già renderizzata) e la accoda; la scrittura su disco
+(np.savetxt, codifica PNG) avviene in un thread separato.
+
+La coda ha profondità limitata: se è piena il lavoro viene scartato e
+contato, invece di bloccare il chiamante (GUI o thread di acquisizione).
+Esiti e errori si leggono con poll() dal thread della GUI.
+
+`EveryNth` è un sink per AcqWorker che salva un CSV ogni n frame acquisiti.
+Dipendenze: numpy
+"""
+
+import os, time, queue, threading, collections
+import numpy as np
+
+EXPORT_DEPTH = 16
+
+# ---------- lavori --------------------------------------------------------
+
+def write_csv(path: str, wl: np.ndarray, values: np.ndarray, column: str = "intensity_counts"):
+    """Stesso layout dei CSV di speclive4.py / examples/data."""
+    np.savetxt(path, np.column_stack([wl, values]), delimiter=",",
+               header=f"wavelength_nm,{column}", comments='')
+
+def write_image(path: str, image):
+    """Salva una QImage già renderizzata (QImage è utilizzabile da altri thread)."""
+    if not image.save(path):
+        raise OSError(f"{path}: scrittura PNG non riuscita")
+
+# ---------- coda ----------------------------------------------------------
+
+class ExportQueue:
+    def __init__(self, depth: int = EXPORT_DEPTH):
+        self._q = queue.Queue(maxsize=depth)
+        self._results = collections.deque()
+        self.done = 0                         # lavori completati
+        self.failed = 0
+        self.dropped = 0                      # scartati a coda piena
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, label: str, fn, *args, quiet: bool = False) -> bool:
+        """Accoda fn(*args) senza attendere; False se la coda è piena."""
+        try:
+            self._q.put_nowait((label, fn, args, quiet))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        return True
+
+    def pending(self) -> int:
+        return self._q.qsize()
+
+    def poll(self) -> list:
+        """Esiti arrivati dall'ultima chiamata: (ok, label, dettaglio)."""
+        out = []
+        while self._results:
+            out.append(self._results.popleft())
+        return out
+
+    def close(self, timeout: float = 10.0):
+        """Completa i lavori in coda e ferma il thread."""
+        self._q.put(None)
+        self._thread.join(timeout)
+
+    # ------------------------------------------------------------------
+    def _run(self):
+        while True:
+            job = self._q.get()
+            if job is None:
+                break
+            label, fn, args, quiet = job
+            t0 = time.perf_counter()
+            try:
+                fn(*args)
+            except Exception as e:            # disco pieno, permessi, ...
+                self.failed += 1
+                self._results.append((False, label, e))
+                continue
+            self.done += 1
+            if not quiet:
+                self._results.append((True, label, time.perf_counter() - t0))
+
+# ---------- salvataggio periodico -----------------------------------------
+
+class EveryNth:
+    """
+    Sink per AcqWorker.sinks: un CSV dei conteggi grezzi ogni `n` frame
+    acquisiti, in `out_dir/<prefisso>_<indice>.csv`. Nel thread di
+    acquisizione resta solo la copia del frame.
+    """
+
+    def __init__(self, exports: ExportQueue, n: int, out_dir: str, wl: np.ndarray,
+                 prefix: str = "frame"):
+        self.exports = exports
+        self.n = max(1, int(n))
+        self.out_dir = out_dir
+        self.wl = np.asarray(wl).copy()
+        self.prefix = prefix
+        self.frames = 0                       # frame visti
+        self.queued = 0
+        os.makedirs(out_dir, exist_ok=True)
+
+    def __call__(self, counts: np.ndarray, t: float = None):
+        if self.frames % self.n == 0:
+            path = os.path.join(self.out_dir, f"{self.prefix}_{self.frames:06d}.csv")
+            if self.exports.submit(path, write_csv, path, self.wl, np.array(counts), quiet=True):
+                self.queued += 1
+        self.frames += 1
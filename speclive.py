@@ -2,25 +2,21 @@
 """
 UI live per Ocean Optics USB2000
 Acquisisce e aggiorna lo spettro ogni 1 s.
+F → tempi per stadio (lettura+media, curva) nella status bar
 
 Avvia con:
     python ui_spettro.py
 """
 
 import sys, time, numpy as np
-from pyqtgraph.Qt import QtWidgets, QtCore
+from pyqtgraph.Qt import QtWidgets, QtCore, QtGui
 import pyqtgraph as pg
-from seabreeze.spectrometers import Spectrometer
+from specdev import open_spectrometer
 from seabreeze._exc import SeaBreezeError
-
-# -------- helper ----------------------------------------------------------
-
-def boxcar(y: np.ndarray, half: int = 2) -> np.ndarray:
-    """Lisciatura boxcar di larghezza 2*half+1."""
-    if half < 1:
-        return y
-    k = np.ones(2 * half + 1) / (2 * half + 1)
-    return np.convolve(y, k, mode="same")
+from specavg import Averager
+from specsmooth import Smoother
+from specdecim import EnvelopeCurve
+from specprof import Profiler
 
 # -------- Qt application --------------------------------------------------
 
@@ -33,12 +29,12 @@ class LiveSpectrum(QtWidgets.QMainWindow):
         # grafico
         self.plot = pg.PlotWidget(axisItems={'bottom': pg.AxisItem(orientation='bottom')})
         self.setCentralWidget(self.plot)
-        self.curve = self.plot.plot(pen=pg.mkPen(width=2))
+        self.curve = EnvelopeCurve(self.plot, pen=pg.mkPen(width=2))   # decimata min/max (peak) da pyqtgraph
 
         # connessione spettrometro
         try:
-            self.spec = Spectrometer.from_first_available()
-        except SeaBreezeError as e:
+            self.spec = open_spectrometer()
+        except (SeaBreezeError, OSError) as e:
             QtWidgets.QMessageBox.critical(self, "Errore", f"Nessuno spettrometro trovato:\n{e}")
             sys.exit(1)
 
@@ -48,32 +44,41 @@ class LiveSpectrum(QtWidgets.QMainWindow):
         self.integ_ms = 100          # integrazione singola
         self.n_avg    = 3            # medie
         self.boxcar_px = 2           # lisciatura
+        self.avg_mode = "block"      # block | running | sliding
         self.spec.integration_time_micros(self.integ_ms * 1000)
         self.wl = self.spec.wavelengths()
+        self.avg = Averager(len(self.wl), self.n_avg, self.avg_mode,
+                            smooth=Smoother("boxcar", self.boxcar_px))
 
         # set up timer 1 s
         self.timer = QtCore.QTimer(self)
         self.timer.timeout.connect(self.acquire_and_plot)
         self.timer.start(1000)
+        self.prof = Profiler(requested_fps=1)           # sonde disattivate (tasto F)
+        self.plot.paintEvent = self.prof.wrap(self.plot.paintEvent, "repaint")
+        QtGui.QShortcut(QtGui.QKeySequence("F"), self,
+                        activated=lambda: self.prof.set_enabled(not self.prof.enabled))
 
     # ---------------------------------------------------------------------
     def acquire_and_plot(self):
-        """Legge n_avg spettri e aggiorna la curva."""
+        """Legge n_avg spettri (o uno in modalità running/sliding) e aggiorna la curva."""
+        self.prof.begin()
         try:
-            s = np.zeros_like(self.wl, dtype=float)
-            for _ in range(self.n_avg):
-                s += self.spec.intensities(correct_dark_counts=True)
-                time.sleep(self.integ_ms / 1000)
-            s /= self.n_avg
-            s = boxcar(s, self.boxcar_px)
+            s = self.avg.acquire(self.spec, dark_correct=True)
+            self.prof.lap("usb+media")
         except Exception as e:
             print("Errore durante lettura spettro:", e)
+            self.avg.reset()
             return
 
         self.curve.setData(self.wl, s)
+        self.prof.lap("curve")
         self.plot.setLabel('bottom', "Lunghezza d'onda (nm)")
         self.plot.setLabel('left', "Conteggi")
         self.plot.enableAutoRange(axis=pg.ViewBox.YAxis, enable=True)
+        msg = f"Acquisizione: {self.avg.duty_text(self.integ_ms)}"
+        if self.prof.enabled: msg += f" | {self.prof.summary()}"
+        self.statusBar().showMessage(msg)
 
     # ---------------------------------------------------------------------
     def closeEvent(self, ev):
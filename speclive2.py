@@ -1,25 +1,28 @@
 # ui_spettro_fast.py
 """
 Spettro live USB2000 – refresh 100 ms, toggle con SPACE.
+Con più spettrometri collegati mostra una curva per dispositivo;
+M alterna le curve separate e lo spettro unito su un unico asse λ.
+K avvia una raffica (cinetica): BURST_FRAMES frame di fila per dispositivo,
+senza ridisegnare, poi waterfall e salvataggio in kinetics_<data>_<seriale>.usbspec.
 Dipendenze: PySide6, pyqtgraph, seabreeze, numpy
 """
 
 import sys, time, numpy as np
 from pyqtgraph.Qt import QtWidgets, QtCore, QtGui
 import pyqtgraph as pg
-from seabreeze.spectrometers import Spectrometer
+from specdev import open_all
 from seabreeze._exc import SeaBreezeError
-
-# ----------------- utility -------------------------------------------------
-def boxcar(arr: np.ndarray, half: int = 2) -> np.ndarray:
-    if half < 1:
-        return arr
-    k = np.ones(2 * half + 1) / (2 * half + 1)
-    return np.convolve(arr, k, mode="same")
+from specmulti import DeviceManager
+from specsmooth import Smoother
+from specdecim import EnvelopeCurve
+from specburst import Burst, waterfall
 
 # ----------------- finestra principale ------------------------------------
 class LiveSpectrum(QtWidgets.QMainWindow):
-    REFRESH_MS = 100          # <- frequenza campionamento (100 ms = 10 Hz)
+    REFRESH_MS = 100          # <- frequenza di refresh del grafico (100 ms = 10 Hz)
+    RING_LEN   = 32           # spettri conservati nel buffer circolare
+    BURST_FRAMES = 1000       # frame per raffica (K): 10 s a 10 ms
 
     def __init__(self):
         super().__init__()
@@ -29,20 +32,38 @@ class LiveSpectrum(QtWidgets.QMainWindow):
         # ---------- grafico
         self.plot = pg.PlotWidget()
         self.setCentralWidget(self.plot)
-        self.curve = self.plot.plot(pen=pg.mkPen(width=2))
 
-        # ---------- spettrometro
+        # ---------- spettrometri (tutti quelli collegati)
         try:
-            self.spec = Spectrometer.from_first_available()
-        except SeaBreezeError as e:
+            self.specs = open_all()
+        except (SeaBreezeError, OSError) as e:
             QtWidgets.QMessageBox.critical(self, "Errore", f"Nessuno spettrometro trovato:\n{e}")
             sys.exit(1)
+        self.spec = self.specs[0]
 
         self.integ_ms   = 10       # integrazione breve, così entra nel ciclo 100 ms
         self.n_avg      = 1        # niente media per massima velocità
         self.boxcar_px  = 1
-        self.spec.integration_time_micros(self.integ_ms * 1000)
-        self.wl = self.spec.wavelengths()
+
+        # ---------- acquisizione: un thread per dispositivo
+        self.devices = DeviceManager(self.specs, self.integ_ms, self.RING_LEN)
+        self.wl = self.devices.wls[0]
+        n = len(self.devices)
+        self.smooth = [Smoother("boxcar", self.boxcar_px) for _ in range(n)]  # buffer riusati
+        self.last = [None] * n                                  # ultimo spettro per dispositivo
+        if n > 1:
+            self.plot.addLegend()
+        self.curves = [EnvelopeCurve(self.plot,
+                                     pen=pg.mkPen(pg.intColor(i, n) if n > 1 else 'w', width=2),
+                                     name=f"{s.model} {s.serial_number}" if n > 1 else None)
+                       for i, s in enumerate(self.specs)]        # decimata min/max (peak) da pyqtgraph
+        self.curve = self.curves[0]
+        self.merged = n > 1 and EnvelopeCurve(self.plot, pen=pg.mkPen('w', width=2), connect="finite")
+        self.stitcher = self.devices.stitcher() if n > 1 else None
+        self.show_merged = False
+        self.devices.start()
+        self.acq_label = QtWidgets.QLabel()
+        self.statusBar().addPermanentWidget(self.acq_label)
 
         # ---------- timer & stato
         self.timer = QtCore.QTimer(self)
@@ -51,35 +72,88 @@ class LiveSpectrum(QtWidgets.QMainWindow):
         self.running = True
 
         # ---------- scorciatoia SPACE per toggle
-        QtWidgets.QShortcut(QtGui.QKeySequence("Space"), self, activated=self.toggle)
+        QtGui.QShortcut(QtGui.QKeySequence("Space"), self, activated=self.toggle)
+        QtGui.QShortcut(QtGui.QKeySequence("M"), self, activated=self.toggle_merged)
+        QtGui.QShortcut(QtGui.QKeySequence("K"), self, activated=self.start_burst)
+        self.bursts = None                # raffica in corso, una per dispositivo
+        self.waterfalls = []              # finestre dei risultati (restano aperte)
+        self.burst_timer = QtCore.QTimer(self)
+        self.burst_timer.timeout.connect(self._check_burst)
 
     # ---------------------------------------------------------------------
     def acquire_and_plot(self):
-        try:
-            counts = self.spec.intensities(correct_dark_counts=True)
-            counts = boxcar(counts, self.boxcar_px)
-            self.curve.setData(self.wl, counts)
-        except Exception as e:
-            # salta un frame se c’è un errore momentaneo
-            print("Errore lettura:", e)
+        """Mostra l'ultimo spettro prodotto da ciascun thread di acquisizione."""
+        self.acq_label.setText(self.devices.status())
+        new = False
+        for i, frame in enumerate(self.devices.latest()):
+            if frame is None:         # nessun frame nuovo dall'ultimo refresh
+                continue
+            self.last[i] = self.smooth[i](frame[0])
+            new = True
+            if not self.show_merged:
+                self.curves[i].setData(self.devices.wls[i], self.last[i])
+        if new and self.show_merged:
+            self.merged.setData(self.stitcher.axis, self.stitcher.merge(self.last))
+
+    # ---------------------------------------------------------------------
+    def toggle_merged(self):
+        """Curve separate ↔ spettro unito su un asse λ comune (M)."""
+        if self.stitcher is None:
+            return
+        self.show_merged = not self.show_merged
+        for c in self.curves:
+            c.setVisible(not self.show_merged)
+        self.merged.setVisible(self.show_merged)
+        if self.show_merged:
+            self.merged.setData(self.stitcher.axis, self.stitcher.merge(self.last))
 
     # ---------------------------------------------------------------------
     def toggle(self):
         """Pausa/riavvia acquisizione (SPACE)."""
         if self.running:
             self.timer.stop()
+            self.devices.pause()
             self.statusBar().showMessage("⏸ Pausa", 2000)
         else:
+            self.devices.resume()
             self.timer.start(self.REFRESH_MS)
             self.statusBar().showMessage("▶️  In acquisizione", 2000)
         self.running = not self.running
 
+    # ---------------------------------------------------------------------
+    def start_burst(self):
+        """Raffica: i frame vanno dal thread di acquisizione al buffer, nessun disegno."""
+        if self.bursts or not self.running:
+            return
+        self.timer.stop()
+        self.bursts = [Burst(len(wl), self.BURST_FRAMES, integ_ms=w.integ_ms)
+                       for wl, w in zip(self.devices.wls, self.devices.workers)]
+        for w, b in zip(self.devices.workers, self.bursts):
+            w.sinks = w.sinks + [b]
+        self.burst_timer.start(250)
+
+    def _check_burst(self):
+        n = sum(b.n for b in self.bursts)
+        self.acq_label.setText(f"raffica {n}/{self.BURST_FRAMES * len(self.bursts)} frame")
+        if not all(b.done for b in self.bursts):
+            return
+        self.burst_timer.stop()
+        bursts, self.bursts = self.bursts, None
+        stamp = time.strftime("%Y%m%d_%H%M%S")
+        for w, b, wl, s in zip(self.devices.workers, bursts, self.devices.wls, self.specs):
+            w.sinks = [x for x in w.sinks if x is not b]
+            path = b.save(f"kinetics_{stamp}_{s.serial_number}.usbspec", wl,
+                          model=s.model, serial=s.serial_number)
+            print(f"{path}: {b.summary()}")
+            win = waterfall(b, wl, f"{s.model} {s.serial_number}")
+            win.show()
+            self.waterfalls.append(win)
+        self.statusBar().showMessage(f"💾 Raffica salvata: {bursts[0].summary()}", 5000)
+        self.timer.start(self.REFRESH_MS)
+
     # ---------------------------------------------------------------------
     def closeEvent(self, ev):
-        try:
-            self.spec.close()
-        except Exception:
-            pass
+        self.devices.close()
         ev.accept()
 
 # --------------------------------------------------------------------------
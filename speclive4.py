@@ -5,39 +5,53 @@ USB2000 live – grafico, CCD strip, hot‑keys:
  C     → salva CSV                (usb2000_YYYYMMDD_HHMMSS.csv)
  P     → salva PNG plot + CCD     (usb2000_YYYYMMDD_HHMMSS_plot.png + _ccd.png)
  S     → salva CSV+PNG in cartella (toolbar o scorciatoia)
+ R     → avvia/ferma registrazione binaria di tutti i frame (usb2000_YYYYMMDD_HHMMSS.usbspec)
+ D     → acquisisce il dark (media di N_REF frame, salvato in cache)
+ B     → acquisisce il riferimento (bianco / cuvetta col solvente)
+ A     → conteggi → trasmittanza → assorbanza
+ E     → integrazione automatica on/off (riempimento 80% della saturazione)
+ W     → waterfall degli ultimi WATERFALL_ROWS spettri sotto la strip
+ N     → avvia/ferma il salvataggio di un CSV ogni BATCH_EVERY frame acquisiti
+ T     → inseguimento picchi on/off (posizione, FWHM, area; con R anche <file>.peaks.csv)
+ F     → tempi per stadio (p50/p95/max) in sovrimpressione e in usb2000_YYYYMMDD_HHMMSS_perf.log
+ (gli export avvengono in background: l'acquisizione non si ferma)
  Hover → cursore λ, I nella status‑bar
 """
 
 import sys, time, numpy as np, datetime as dt, os
 from pyqtgraph.Qt import QtWidgets, QtCore, QtGui
 import pyqtgraph as pg
-from pyqtgraph.exporters import ImageExporter
-from seabreeze.spectrometers import Spectrometer
+from specdev import open_spectrometer
 from seabreeze._exc import SeaBreezeError
+from specacq import FrameRing, AcqWorker
+from specccd import CCDStrip, rgb_table
+from specrec import Recorder
+from specsmooth import Smoother
+from specdecim import EnvelopeCurve
+from specref import References, Capture, LABELS, COLUMNS, MODES
+from specauto import AutoExposure, saturation_of, limits_of
+from specwfall import Waterfall, view_box
+from specexport import ExportQueue, EveryNth, write_csv, write_image
+from specpeaks import PeakTracker
+from specprof import Profiler, open_log, write_log
 
 # --------------------- util ------------------------------------------------
-def wavelength_to_rgb(l):
-    if l < 380: t=(l-200)/180; return 0.5*(1-t),0,1
-    if l < 440: return 0,0,1
-    if l < 490: t=(l-440)/50;return 0,t,1
-    if l < 510: t=(l-490)/20;return 0,1,1-t
-    if l < 580: t=(l-510)/70;return t,1,0
-    if l < 645: t=(l-580)/65;return 1,1-t,0
-    if l < 780: return 1,0,0
-    t=(l-780)/320; return 1,t,t                         # IR
-def boxcar(y, half=1):
-    if half<1: return y
-    k=np.ones(2*half+1)/(2*half+1)
-    return np.convolve(y,k,'same')
 def timestamp():
     return dt.datetime.now().strftime("%Y%m%d_%H%M%S")
 
 # --------------------- UI --------------------------------------------------
 class LiveSpectrum(QtWidgets.QMainWindow):
     REFRESH_MS = 100
-    def __init__(self):
+    RING_LEN = 32                                        # spettri nel buffer circolare
+    N_REF = 20                                           # frame mediati per dark/riferimento
+    WATERFALL_ROWS = 600                                 # 1 min a 10 Hz
+    BATCH_EVERY = 10                                     # N: un CSV ogni 10 frame acquisiti
+    PEAKS_SHOWN = 3                                      # picchi riportati nella status bar
+    PROF_REPORT_S = 1.0                                  # aggiornamento sovrimpressione e log
+    def __init__(self, spec=None):
+        """`spec` già aperto (es. da specstart.py); altrimenti il primo disponibile."""
         super().__init__()
-        self.setWindowTitle("USB2000 – spettro live  [SPACE pausa | C csv | P plot+ccd | S cartella]")
+        self.setWindowTitle("USB2000 – spettro live  [SPACE pausa | C csv | P plot+ccd | S cartella | R rec | D dark | B rif | A modo | E auto | W waterfall | N ogni N | T picchi | F tempi]")
         self.resize(900,600)
 
         # layout: grafico + immagine
@@ -46,11 +60,14 @@ class LiveSpectrum(QtWidgets.QMainWindow):
         self.plot = glw.addPlot(row=0,col=0)
         self.plot.setLabel('bottom',"Lunghezza d'onda (nm)")
         self.plot.setLabel('left',"Conteggi")
-        self.curve = self.plot.plot(pen=pg.mkPen(width=2))
+        self.curve = EnvelopeCurve(self.plot, pen=pg.mkPen(width=2),    # decimata min/max (peak) da pyqtgraph
+                                   connect="finite")     # NaN dove il riferimento è buio
         # ---------- cross‑hair cursor ----------------------------------
         self.vLine = pg.InfiniteLine(angle=90, movable=False, pen=pg.mkPen('y'))
         self.hLine = pg.InfiniteLine(angle=0,  movable=False, pen=pg.mkPen('y'))
         self.plot.addItem(self.vLine); self.plot.addItem(self.hLine)
+        self.peak_marks = pg.ScatterPlotItem(symbol='t', size=10, brush='r', pen=None)
+        self.plot.addItem(self.peak_marks)
         # aggiorna le linee al movimento del mouse (60 Hz max)
         self._proxy = pg.SignalProxy(self.plot.scene().sigMouseMoved,
                                      rateLimit=60,
@@ -61,22 +78,56 @@ class LiveSpectrum(QtWidgets.QMainWindow):
 
         # spettrometro
         try:
-            self.spec = Spectrometer.from_first_available()
-        except SeaBreezeError as e:
+            self.spec = spec or open_spectrometer()
+        except (SeaBreezeError, OSError) as e:
             QtWidgets.QMessageBox.critical(self,"Errore",str(e)); sys.exit(1)
         self.integ_ms=10; self.spec.integration_time_micros(self.integ_ms*1000)
+        self.smooth = Smoother("boxcar", 1)              # lisciatura 3 px, buffer riusati
         self.wl = self.spec.wavelengths()
         # mostra nome e seriale sul titolo del plot
         self.plot.setTitle(f"{self.spec.model}  S/N: {self.spec.serial_number}")
-        self.base_rgb = np.array([wavelength_to_rgb(w) for w in self.wl])
+        self.base_rgb = rgb_table(self.wl, self.spec.serial_number)
+        self.strip = CCDStrip(self.img_item, self.img_vb, self.wl, self.base_rgb)  # geometria fissa
+        # waterfall: buffer circolare, una riga per frame; fuori dal layout finché non serve
+        self.wfall = Waterfall(self.wl, self.WATERFALL_ROWS, levels=(0, saturation_of(self.spec)))
+        self.wf_vb = view_box(self.wfall); self.wf_shown = False
         self.last_counts = None                          # buffer per salvataggio
+        self.recorder = None                             # registrazione binaria attiva
+        # dark/riferimento dalla cache, se validi per seriale e integrazione
+        self.refs = References(self.spec.serial_number, self.wl, self.integ_ms * 1000)
+        self.capture = None                              # cattura dark/riferimento in corso
+        self.auto = None                                 # integrazione automatica (tasto E)
+        self.exports = ExportQueue()                     # scritture su disco in background
+        self.batch = None                                # salvataggio ogni N frame (tasto N)
+        self.peaks = None                                # inseguimento picchi (tasto T)
+        # sonde di temporizzazione (tasto F): disattivate costano un controllo per stadio
+        self.prof = Profiler(requested_fps=1000 / self.REFRESH_MS)
+        glw.paintEvent = self.prof.wrap(glw.paintEvent, "repaint")
+        self.prof_label = QtWidgets.QLabel(glw); self.prof_label.hide()
+        self.prof_label.setStyleSheet("background: rgba(0,0,0,170); color: #0f0;"
+                                      " font-family: monospace; padding: 4px;")
+        self.prof_label.move(70, 30); self._prof_t = 0.0; self.prof_log = None
+        # acquisizione in thread separato, la GUI preleva l'ultimo frame
+        self.ring = FrameRing(self.RING_LEN, len(self.wl))
+        self.worker = AcqWorker(self.spec, self.ring, self.integ_ms); self.worker.start()
+        self.worker.prof.requested_fps = 1000 / self.integ_ms
+        self.acq_label = QtWidgets.QLabel(); self.statusBar().addPermanentWidget(self.acq_label)
 
         # timer & scorciatoie
         self.timer = QtCore.QTimer(self); self.timer.timeout.connect(self.update_frame)
         self.timer.start(self.REFRESH_MS); self.running=True
-        QtWidgets.QShortcut(QtGui.QKeySequence("Space"), self, activated=self.toggle)
-        QtWidgets.QShortcut(QtGui.QKeySequence("C"),     self, activated=self.save_csv)
-        QtWidgets.QShortcut(QtGui.QKeySequence("P"),     self, activated=self.save_png)
+        QtGui.QShortcut(QtGui.QKeySequence("Space"), self, activated=self.toggle)
+        QtGui.QShortcut(QtGui.QKeySequence("C"),     self, activated=self.save_csv)
+        QtGui.QShortcut(QtGui.QKeySequence("P"),     self, activated=self.save_png)
+        QtGui.QShortcut(QtGui.QKeySequence("R"),     self, activated=self.toggle_record)
+        QtGui.QShortcut(QtGui.QKeySequence("D"),     self, activated=lambda: self.start_capture("dark"))
+        QtGui.QShortcut(QtGui.QKeySequence("B"),     self, activated=lambda: self.start_capture("reference"))
+        QtGui.QShortcut(QtGui.QKeySequence("A"),     self, activated=self.cycle_mode)
+        QtGui.QShortcut(QtGui.QKeySequence("E"),     self, activated=self.toggle_auto)
+        QtGui.QShortcut(QtGui.QKeySequence("W"),     self, activated=self.toggle_waterfall)
+        QtGui.QShortcut(QtGui.QKeySequence("N"),     self, activated=self.toggle_batch)
+        QtGui.QShortcut(QtGui.QKeySequence("T"),     self, activated=self.toggle_peaks)
+        QtGui.QShortcut(QtGui.QKeySequence("F"),     self, activated=self.toggle_profiling)
         # toolbar e azione di salvataggio combinato
         self.toolbar = self.addToolBar("File")
         act_save = QtGui.QAction("Save CSV+PNG", self)
@@ -86,60 +137,71 @@ class LiveSpectrum(QtWidgets.QMainWindow):
 
     # ------------- aggiornamento ------------------------------------------
     def update_frame(self):
-        try:
-            counts = self.spec.intensities(correct_dark_counts=True)
-        except Exception as e:
-            print("Errore lettura:",e); return
-        counts = boxcar(counts,1); self.last_counts = counts
-        self.curve.setData(self.wl, counts)
-        norm = counts/counts.max() if counts.max() else counts
-        rgb_line = (self.base_rgb*norm[:,None]).clip(0,1)
-        img = np.tile((rgb_line*255).astype(np.uint8)[None,:,:],(50,1,1))
-        self.img_item.setImage(img,autoLevels=False); self.img_item.resetTransform()
-        self.img_item.setRect(QtCore.QRectF(self.wl[0],0,self.wl[-1]-self.wl[0],1))
-        self.img_vb.setYRange(0,1,padding=0); self.img_vb.setXRange(self.wl[0],self.wl[-1],padding=0)
+        prof = self.prof; prof.begin()
+        status = self.worker.status()
+        if self.recorder: status += f" | ● REC {self.recorder.frames}"
+        if self.auto: status += f" | {self.auto.status()}"
+        if self.batch: status += f" | ⏺ 1/{self.batch.n}: {self.batch.queued} CSV"
+        if self.exports.pending(): status += f" | export in coda {self.exports.pending()}"
+        if self.peaks: status += f" | {self._peak_status()}"
+        self._report_exports()
+        if self.worker.integ_ms != self.integ_ms: self._integration_changed()
+        self.acq_label.setText(status + f" | {self.refs.describe()}")
+        if self.capture and self.capture.result is not None: self._finish_capture()
+        if prof.enabled: self._report_timings()
+        prof.lap("status")
+        frame = self.ring.latest()
+        if frame is None: return                         # nessun frame nuovo
+        prof.lap("ring")
+        counts = self.refs.process(frame[0]); prof.lap("refs")
+        counts = self.smooth(counts); self.last_counts = counts; prof.lap("boxcar")
+        self.curve.setData(self.wl, counts); prof.lap("curve")
+        # solo i pixel, geometria invariata; fuori dai conteggi la strip resta sul frame grezzo
+        self.strip.update(counts if self.refs.mode == "counts" else frame[0]); prof.lap("ccd")
+        if self.peaks: self._mark_peaks(); prof.lap("peaks")
+        self.wfall.add(counts); prof.lap("waterfall")    # una riga, anche se nascosto
 
     # ------------------- cursore -----------------------------------
     def _mouse_moved(self, evt):
         """
-        Aggiorna la posizione del cursore e mostra λ & I sulla status‑bar.
+        Aggiorna la posizione del cursore e mostra λ & I sulla status‑bar
+        (I è il conteggio del pixel più vicino, non la quota del mouse).
         """
         pos = evt[0]  # QPointF dal SignalProxy
         if self.plot.sceneBoundingRect().contains(pos):
             mouse_point = self.plot.vb.mapSceneToView(pos)
             x = mouse_point.x()
-            y = mouse_point.y()
+            y = self.curve.value_at(x)                   # dati a piena risoluzione,
+            if y is None: y = mouse_point.y()            # non la curva decimata
             self.vLine.setPos(x)
             self.hLine.setPos(y)
             self.statusBar().showMessage(f"λ = {x:0.1f} nm   I = {y:0.0f}", 0)
 
     # ------------- hotkeys -------------------------------------------------
     def toggle(self):
-        if self.running: self.timer.stop(); self.statusBar().showMessage("⏸ Pausa",2000)
-        else: self.timer.start(self.REFRESH_MS); self.statusBar().showMessage("▶️ Live",2000)
+        if self.running: self.timer.stop(); self.worker.pause(); self.statusBar().showMessage("⏸ Pausa",2000)
+        else: self.worker.resume(); self.timer.start(self.REFRESH_MS); self.statusBar().showMessage("▶️ Live",2000)
         self.running = not self.running
 
     def save_csv(self, filepath=None):
+        """Copia dello spettro mostrato; la scrittura avviene nel thread di export."""
         if self.last_counts is None: return
         fname = filepath or f"usb2000_{timestamp()}.csv"
-        np.savetxt(fname, np.column_stack([self.wl, self.last_counts]),
-                   delimiter=",", header="wavelength_nm,intensity_counts", comments='')
-        self.statusBar().showMessage(f"💾 CSV salvato: {fname}",3000)
+        self._submit(f"💾 CSV salvato: {fname}", write_csv, fname, self.wl,
+                     self.last_counts.copy(), COLUMNS[self.refs.mode])
 
     def save_png(self, filepath=None):
         """
-        Salva il grafico e la strip CCD come PNG separati.
+        Salva il grafico e la strip CCD come PNG separati. Il rendering (scena Qt)
+        resta nel thread della GUI, la codifica PNG e la scrittura no.
         """
+        from pyqtgraph.exporters import ImageExporter     # import al primo salvataggio
         base = filepath or f"usb2000_{timestamp()}"
-        # salva grafico
-        exporter_plot = ImageExporter(self.plot)
-        exporter_plot.params['width'] = 1200
-        exporter_plot.export(f"{base}_plot.png")
-        # salva ccd strip
-        exporter_ccd = ImageExporter(self.img_item)
-        exporter_ccd.params['width'] = 1200
-        exporter_ccd.export(f"{base}_ccd.png")
-        self.statusBar().showMessage(f"🖼️  Salvati {base}_plot.png e {base}_ccd.png", 4000)
+        for item, suffix in ((self.plot, "plot"), (self.img_item, "ccd")):
+            exporter = ImageExporter(item)
+            exporter.params['width'] = 1200
+            image = exporter.export(toBytes=True)            # QImage, niente disco
+            self._submit(f"🖼️  Salvato {base}_{suffix}.png", write_image, f"{base}_{suffix}.png", image)
 
     def save_all(self):
         """
@@ -149,10 +211,181 @@ class LiveSpectrum(QtWidgets.QMainWindow):
         os.makedirs(base, exist_ok=True)
         self.save_csv(os.path.join(base, base + ".csv"))
         self.save_png(os.path.join(base, base))
-        self.statusBar().showMessage(f"✅ Salvati CSV e PNG in {base}/", 4000)
+
+    def toggle_batch(self):
+        """Un CSV (conteggi grezzi) ogni BATCH_EVERY frame acquisiti, in una cartella."""
+        if self.batch is None:
+            base = f"usb2000_{timestamp()}_ogni{self.BATCH_EVERY}"
+            self.batch = EveryNth(self.exports, self.BATCH_EVERY, base, self.wl, "usb2000")
+            self.worker.sinks = self.worker.sinks + [self.batch]
+            self.statusBar().showMessage(f"⏺ Salvataggio ogni {self.BATCH_EVERY} frame in {base}/", 3000)
+        else:
+            batch, self.batch = self.batch, None
+            self.worker.sinks = [s for s in self.worker.sinks if s is not batch]
+            self.statusBar().showMessage(f"■ {batch.queued} CSV accodati in {batch.out_dir}/", 4000)
+
+    def _submit(self, label, fn, *args):
+        if not self.exports.submit(label, fn, *args):
+            self.statusBar().showMessage("⚠️ Coda di export piena: salvataggio scartato", 3000)
+
+    def _report_exports(self):
+        """Esiti degli export completati dal thread in background."""
+        for ok, label, detail in self.exports.poll():
+            if ok: self.statusBar().showMessage(label, 3000)
+            else: self.statusBar().showMessage(f"❌ Export non riuscito: {detail}", 6000)
+
+    def toggle_record(self):
+        """
+        Avvia/ferma la registrazione continua: ogni frame acquisito (non solo
+        quelli mostrati) viene scritto in un file .usbspec dal thread del Recorder,
+        con l'integrazione usata per quel frame (cambia con l'esposizione automatica).
+        """
+        if self.recorder is None:
+            fname = f"usb2000_{timestamp()}.usbspec"
+            self.recorder = Recorder(fname, self.wl, model=self.spec.model,
+                                     serial=self.spec.serial_number, integ_ms=self.integ_ms)
+            rec, worker = self.recorder, self.worker
+            self._rec_sink = lambda counts, t: rec.write(counts, t, worker.integ_ms)
+            self.worker.sinks = self.worker.sinks + [self._rec_sink]
+            if self.peaks: self.peaks.open_log(self._peaks_path())
+            self.statusBar().showMessage(f"● Registrazione in {fname}",3000)
+        else:
+            rec, self.recorder = self.recorder, None
+            self.worker.sinks = [s for s in self.worker.sinks if s is not self._rec_sink]
+            rec.close()
+            if self.peaks: self.peaks.close_log()
+            self.statusBar().showMessage(f"■ Registrati {rec.frames} frame in {rec.path}",4000)
+
+    # ------------- dark / riferimento --------------------------------------
+    def start_capture(self, kind):
+        """Media i prossimi N_REF frame grezzi nel thread di acquisizione."""
+        if self.capture: return
+        if self.auto: self.auto.enabled = False          # integrazione ferma durante la media
+        self.capture = Capture(kind, len(self.wl), self.N_REF)
+        self.worker.sinks = self.worker.sinks + [self.capture]
+        self.statusBar().showMessage(f"Acquisizione {kind} ({self.N_REF} frame)…", 0)
+
+    def _finish_capture(self):
+        cap, self.capture = self.capture, None
+        self.worker.sinks = [s for s in self.worker.sinks if s is not cap]
+        self.refs.store(cap.kind, cap.result, cap.n_avg)
+        if self.auto: self.auto.enabled = True
+        self.statusBar().showMessage(f"✅ {cap.kind} salvato ({cap.n_avg} frame, {self.integ_ms} ms)", 3000)
+
+    def cycle_mode(self):
+        """Conteggi → trasmittanza → assorbanza (le ultime due richiedono il riferimento)."""
+        mode = MODES[(MODES.index(self.refs.mode) + 1) % len(MODES)]
+        try:
+            self.refs.set_mode(mode)
+        except ValueError as e:
+            self.statusBar().showMessage(f"⚠️ {e} (tasto B)", 3000); return
+        self.plot.setLabel('left', LABELS[mode])
+        self.plot.enableAutoRange(axis=pg.ViewBox.YAxis)
+        self._waterfall_levels()
+
+    # ------------- waterfall ----------------------------------------------
+    def toggle_waterfall(self):
+        if self.wf_shown: self.glw.removeItem(self.wf_vb)
+        else: self.glw.addItem(self.wf_vb, row=2, col=0)
+        self.wf_shown = not self.wf_shown
+
+    def _waterfall_levels(self):
+        """Scala colori della grandezza mostrata; la storia in un'altra scala si azzera."""
+        hi = {"counts": saturation_of(self.spec), "transmittance": 1.0, "absorbance": 2.0}
+        self.wfall.set_levels(0, hi[self.refs.mode]); self.wfall.clear()
+
+    # ------------- picchi --------------------------------------------------
+    def toggle_peaks(self):
+        """
+        Il tracker gira come sink su ogni frame grezzo acquisito; la GUI legge
+        solo l'ultimo risultato. Durante una registrazione la serie temporale
+        va in <file>.peaks.csv, con gli stessi t del .usbspec.
+        """
+        if self.peaks is None:
+            self.peaks = PeakTracker(self.wl)
+            if self.recorder: self.peaks.open_log(self._peaks_path())
+            self.worker.sinks = self.worker.sinks + [self.peaks]
+            self.statusBar().showMessage("Inseguimento picchi attivo", 2000)
+        else:
+            peaks, self.peaks = self.peaks, None
+            self.worker.sinks = [s for s in self.worker.sinks if s is not peaks]
+            peaks.close_log()
+            self.peak_marks.clear()
+            self.statusBar().showMessage(f"Inseguimento picchi fermo ({peaks.searches} ricerche"
+                                         f" complete su {peaks.frames} frame)", 3000)
+
+    def _peaks_path(self):
+        return self.recorder.path.rsplit(".", 1)[0] + ".peaks.csv"
+
+    def _mark_peaks(self):
+        """Triangoli sui picchi, all'altezza della curva mostrata."""
+        pos = self.peaks.snapshot()["pos"]
+        pos = pos[np.isfinite(pos)]
+        self.peak_marks.setData(pos, [self.curve.value_at(x) for x in pos])
+
+    def _peak_status(self):
+        r = self.peaks.snapshot()
+        order = np.argsort(r["height"])[::-1][:self.PEAKS_SHOWN]    # i più alti
+        shown = [f"{r['pos'][i]:.2f} nm (FWHM {r['fwhm'][i]:.2f})" for i in order
+                 if np.isfinite(r["pos"][i])]
+        return "picchi: " + (", ".join(shown) if shown else "—")
+
+    # ------------- tempi ---------------------------------------------------
+    def toggle_profiling(self):
+        """Sonde GUI (update_frame + ridisegno) e del worker (usb, sinks); log su file."""
+        on = not self.prof.enabled
+        for p in (self.prof, self.worker.prof):
+            p.set_enabled(on)
+        if on:
+            fname = f"usb2000_{timestamp()}_perf.log"
+            self.prof_log = open_log(fname); self._prof_t = time.monotonic()
+            self.prof_label.setText("misura in corso…"); self.prof_label.adjustSize()
+            self.prof_label.show()
+            self.statusBar().showMessage(f"Tempi per stadio → {fname}", 3000)
+        else:
+            self.prof_log.close(); self.prof_log = None
+            self.prof_label.hide()
+
+    def _report_timings(self):
+        """Sovrimpressione e log al massimo una volta ogni PROF_REPORT_S."""
+        now = time.monotonic()
+        if now - self._prof_t < self.PROF_REPORT_S: return
+        self._prof_t = now
+        self.prof_label.setText(self.worker.prof.report("acq") + "\n\n" + self.prof.report("gui"))
+        self.prof_label.adjustSize()
+        write_log(self.prof_log, "acq", self.worker.prof); write_log(self.prof_log, "gui", self.prof)
+
+    # ------------- integrazione automatica ----------------------------------
+    def toggle_auto(self):
+        """Il regolatore gira come sink nel thread di acquisizione, un frame alla volta."""
+        if self.auto is None:
+            self.auto = AutoExposure(saturation_of(self.spec), self.worker.integ_ms * 1000,
+                                     limits=limits_of(self.spec), apply=self.worker.set_integration)
+            self.worker.sinks = self.worker.sinks + [self.auto]
+            self.statusBar().showMessage("Integrazione automatica attiva", 2000)
+        else:
+            auto, self.auto = self.auto, None
+            self.worker.sinks = [s for s in self.worker.sinks if s is not auto]
+            self.statusBar().showMessage(f"Integrazione fissata a {self.integ_ms:.1f} ms"
+                                         f" ({auto.wasted} frame spesi per regolare)", 3000)
+
+    def _integration_changed(self):
+        """Nuova integrazione applicata dal worker: dark/riferimento della nuova chiave."""
+        self.integ_ms = self.worker.integ_ms
+        self.worker.prof.requested_fps = 1000 / self.integ_ms
+        mode = self.refs.mode
+        self.refs.set_integration(self.integ_ms * 1000)
+        if self.refs.mode != mode:                       # nessun riferimento per questa integrazione
+            self.plot.setLabel('left', LABELS[self.refs.mode]); self._waterfall_levels()
+            self.statusBar().showMessage(f"⚠️ nessun riferimento a {self.integ_ms:.1f} ms: conteggi", 3000)
 
     # ----------------------------------------------------------------------
     def closeEvent(self,ev):
+        self.worker.stop()
+        self.exports.close()                             # completa gli export in coda
+        if self.recorder: self.recorder.close()
+        if self.peaks: self.peaks.close_log()
+        if self.prof_log: self.prof_log.close()
         try: self.spec.close()
         except Exception: pass
         ev.accept()
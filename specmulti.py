@@ -0,0 +1,144 @@
+# specmulti.py
+"""
+Più spettrometri nello stesso processo (es. USB2000 UV + USB4000 NIR).
+
+`DeviceManager` apre un AcqWorker per dispositivo, così i trasferimenti USB
+si sovrappongono invece di sommarsi. Tutti i frame hanno timestamp
+time.monotonic() (stesso orologio per tutti i dispositivi) e il seriale.
+
+`Stitcher` unisce gli spettri su un unico asse λ: indici e pesi di
+interpolazione sono calcolati una volta, poi ogni unione costa pochi
+np.take/moltiplicazioni nei buffer preallocati. Nelle zone di
+sovrapposizione i dispositivi sono mediati, nei buchi (e dove copre solo
+un dispositivo senza ancora frame) l'uscita è NaN.
+Dipendenze: numpy
+"""
+
+import numpy as np
+from specacq import FrameRing, AcqWorker
+
+# ---------- gestione dispositivi ------------------------------------------
+
+class DeviceManager:
+    def __init__(self, specs: list, integ_ms: float = None, ring_len: int = 32,
+                 dark_correct: bool = True):
+        self.specs = specs
+        self.serials = [s.serial_number for s in specs]
+        self.wls, self.rings, self.workers = [], [], []
+        for s in specs:
+            if integ_ms:
+                s.integration_time_micros(int(integ_ms * 1000))
+            wl = np.asarray(s.wavelengths(), dtype=float)
+            ring = FrameRing(ring_len, len(wl))
+            self.wls.append(wl)
+            self.rings.append(ring)
+            self.workers.append(AcqWorker(s, ring, integ_ms, dark_correct))
+        self.t_last = [None] * len(specs)
+
+    def __len__(self):
+        return len(self.specs)
+
+    def start(self):
+        for w in self.workers:
+            w.start()
+
+    def pause(self):
+        for w in self.workers:
+            w.pause()
+
+    def resume(self):
+        for w in self.workers:
+            w.resume()
+
+    def stop(self):
+        for w in self.workers:
+            w.stop()
+
+    def close(self):
+        self.stop()
+        for s in self.specs:
+            try:
+                s.close()
+            except Exception:
+                pass
+
+    # ------------------------------------------------------------------
+    def latest(self) -> list:
+        """Per ogni dispositivo (counts, t) del frame più nuovo, o None."""
+        frames = [r.latest() for r in self.rings]
+        for i, f in enumerate(frames):
+            if f is not None:
+                self.t_last[i] = f[1]
+        return frames
+
+    def skew_ms(self) -> float:
+        """Distanza tra i timestamp degli ultimi frame dei vari dispositivi."""
+        t = [x for x in self.t_last if x is not None]
+        return 1000 * (max(t) - min(t)) if len(t) > 1 else 0.0
+
+    def status(self) -> str:
+        if len(self.workers) == 1:
+            return self.workers[0].status()
+        parts = [f"{s} {w.fps:.0f} fps, persi {r.dropped}, err {w.errors}"
+                 for s, w, r in zip(self.serials, self.workers, self.rings)]
+        return " | ".join(parts) + f" | skew {self.skew_ms():.0f} ms"
+
+    def stitcher(self, step: float = None) -> "Stitcher":
+        return Stitcher(self.wls, step)
+
+# ---------- asse λ unito --------------------------------------------------
+
+class Stitcher:
+    def __init__(self, wls: list, step: float = None):
+        lo = min(w[0] for w in wls)
+        hi = max(w[-1] for w in wls)
+        if step is None:                      # passo del dispositivo più fine
+            step = min(float(np.median(np.diff(w))) for w in wls)
+        self.axis = np.arange(lo, hi + step / 2, step)
+        n = len(self.axis)
+
+        self._maps = []                       # (slice, indici, frazioni)
+        for wl in wls:
+            a = np.searchsorted(self.axis, wl[0], side="left")
+            b = np.searchsorted(self.axis, wl[-1], side="right")
+            x = self.axis[a:b]
+            i = np.clip(np.searchsorted(wl, x, side="right") - 1, 0, len(wl) - 2)
+            frac = np.clip((x - wl[i]) / (wl[i + 1] - wl[i]), 0, 1)
+            self._maps.append((slice(a, b), i, frac))
+        self._weights = {}                    # dispositivi presenti → (pesi, buchi)
+        self.out = np.empty(n)
+        self._a = np.empty(n)
+        self._b = np.empty(n)
+
+    def merge(self, counts: list, out: np.ndarray = None) -> np.ndarray:
+        """Unisce gli spettri (stesso ordine degli assi λ) sull'asse comune."""
+        out = self.out if out is None else out
+        out[:] = 0
+        present = tuple(c is not None for c in counts)
+        weights, gap = self._weights_for(present)
+        for c, (s, i, frac), w in zip(counts, self._maps, weights):
+            if c is None:
+                continue
+            k = s.stop - s.start
+            a, b = self._a[:k], self._b[:k]
+            np.take(c, i, out=a)
+            np.take(c, i + 1, out=b)
+            b -= a                             # interpolazione lineare
+            b *= frac
+            a += b
+            a *= w
+            out[s] += a
+        out[gap] = np.nan
+        return out
+
+    def _weights_for(self, present: tuple) -> tuple:
+        """Pesi 1/copertura e buchi contando solo i dispositivi con un frame (in cache)."""
+        hit = self._weights.get(present)
+        if hit is None:
+            cover = np.zeros(len(self.axis))
+            for (s, _, _), p in zip(self._maps, present):
+                if p:
+                    cover[s] += 1
+            weights = [1.0 / np.maximum(cover[s], 1) for s, _, _ in self._maps]
+            hit = self._weights[present] = (weights, cover == 0)
+        return hit
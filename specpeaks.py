@@ -0,0 +1,274 @@
+# specpeaks.py
+"""
+Ricerca e inseguimento dei picchi (righe di emissione) a ogni frame.
+
+La ricerca completa (massimi locali sopra mediana + min_snr·rumore, rumore
+stimato con la MAD) si fa una volta sola; poi per ogni picco si guarda solo
+una finestra di 2·half+1 pixel attorno alla posizione nota. Ogni picco ha la
+sua half: ≥ 3σ della riga misurata alla ricerca (così i bordi della
+finestra, usati come fondo locale, sono fuori dalle ali), ma al più metà
+della distanza dal picco vicino, così una riga larga non fa sconfinare la
+finestra sulla riga accanto. Le finestre sono una matrice di indici
+precalcolata (n_picchi × finestra più larga, le più strette ripetono il
+proprio bordo): a ogni frame un solo np.take raccoglie i dati e il
+raffinamento è vettoriale su tutti i picchi. Se un picco si sposta la sua
+finestra viene ricentrata; se scende sotto soglia, o se due finestre finiscono
+sulla stessa riga, la ricerca completa viene ripetuta.
+
+Raffinamento sub-pixel:
+    gauss     parabola sul logaritmo di 3 punti (massimo e ±σ circa)
+              (posizione, sigma → FWHM, area = altezza·sigma·√2π)
+    centroid  baricentro e secondo momento della finestra
+
+Per ogni frame: posizione (nm), FWHM (nm), area (conteggi·nm), altezza.
+Serie temporale: `history` (ultimi HISTORY frame) e, se aperto, un CSV
+t,pos1_nm,fwhm1_nm,area1,... con lo stesso t delle registrazioni .usbspec.
+
+    python specpeaks.py registrazione.usbspec [-o picchi.csv]
+Dipendenze: numpy
+"""
+
+import sys, argparse, threading
+import numpy as np
+
+HISTORY = 600
+METHODS = ("gauss", "centroid")
+FWHM_PER_SIGMA = 2.0 * np.sqrt(2.0 * np.log(2.0))
+SQRT_2PI = np.sqrt(2.0 * np.pi)
+WINDOW_SIGMAS = 3.0               # semi-larghezza della finestra in σ della riga
+MAX_HALF = 60                     # px
+
+# ---------- ricerca completa ----------------------------------------------
+
+def noise_level(y: np.ndarray):
+    """(mediana, rumore) con rumore = 1.4826·MAD: poco sensibile ai picchi."""
+    base = float(np.median(y))
+    noise = 1.4826 * float(np.median(np.abs(y - base)))
+    return base, noise if noise > 0 else 1.0
+
+def find_peaks(y: np.ndarray, min_snr: float = 5.0, min_distance: int = 5,
+               max_peaks: int = 10) -> np.ndarray:
+    """Indici (crescenti) dei massimi locali più alti, distanti almeno min_distance px."""
+    base, noise = noise_level(y)
+    c = y[1:-1]
+    idx = np.flatnonzero((c > y[:-2]) & (c >= y[2:]) & (c > base + min_snr * noise)) + 1
+    keep = []
+    for i in idx[np.argsort(y[idx])[::-1]]:       # dal più alto
+        if all(abs(i - k) >= min_distance for k in keep):
+            keep.append(i)
+            if len(keep) == max_peaks:
+                break
+    return np.sort(np.array(keep, dtype=np.intp))
+
+# ---------- inseguimento --------------------------------------------------
+
+class PeakTracker:
+    def __init__(self, wl: np.ndarray, half: int = 6, max_peaks: int = 10,
+                 min_snr: float = 5.0, method: str = "gauss"):
+        if method not in METHODS:
+            raise ValueError(f"metodo sconosciuto: {method!r} (usa {METHODS})")
+        self.wl = np.asarray(wl, dtype=float)
+        self.n = len(self.wl)
+        self.min_half = half
+        self.half = half                           # finestra più larga
+        self.halves = np.zeros(0, dtype=np.intp)   # semi-larghezza di ogni picco
+        self._want = np.zeros(0, dtype=np.intp)    # da 3σ, prima del limite dei vicini
+        self.max_peaks = max_peaks
+        self.min_snr = min_snr
+        self.method = method
+        self._pix = np.arange(self.n, dtype=float)
+        self._disp = np.gradient(self.wl)          # nm per pixel
+        self.searches = 0                          # ricerche complete eseguite
+        self.frames = 0
+        self.centers = np.zeros(0, dtype=np.intp)
+        self._log = None
+        self._lock = threading.Lock()
+        k = max_peaks
+        self.history_t = np.full(HISTORY, np.nan)
+        self.history = {q: np.full((HISTORY, k), np.nan) for q in ("pos", "fwhm", "area")}
+        self._hist_i = 0
+        self.result = self._empty()
+
+    def _empty(self) -> dict:
+        return {q: np.zeros(0) for q in ("pos", "fwhm", "area", "height")}
+
+    # ------------------------------------------------------------------
+    def search(self, y: np.ndarray):
+        """Ricerca completa: nuove finestre di indici (e storia azzerata)."""
+        self.searches += 1
+        self.base, self.noise = noise_level(y)
+        centers = find_peaks(y, self.min_snr, self.min_half + 1, self.max_peaks)
+        self._set_centers(centers, self._half_for(y, centers))
+        for h in self.history.values():
+            h[:] = np.nan
+
+    def _half_for(self, y: np.ndarray, centers: np.ndarray) -> np.ndarray:
+        """Per ogni picco la semi-larghezza che copre WINDOW_SIGMAS σ della riga (mezza altezza)."""
+        sigma = np.zeros(len(centers))
+        for i, c in enumerate(centers):
+            level = 0.5 * (y[c] + self.base)
+            right = y[c:c + MAX_HALF] < level
+            left = y[max(c - MAX_HALF, 0):c + 1][::-1] < level
+            if right.any() and left.any():          # mezza altezza raggiunta da entrambi i lati
+                hwhm = 0.5 * (np.argmax(right) + np.argmax(left))
+                sigma[i] = 2 * hwhm / FWHM_PER_SIGMA
+        return np.clip(np.ceil(WINDOW_SIGMAS * sigma), self.min_half, MAX_HALF).astype(np.intp)
+
+    def _set_centers(self, centers: np.ndarray, want: np.ndarray = None):
+        """Finestre per i centri (senza doppioni), ognuna entro metà distanza dai vicini."""
+        want = self._want if want is None else want
+        centers, first = np.unique(centers, return_index=True)
+        want = want[first]
+        halves = want.copy()
+        if len(centers) > 1:
+            gap = np.diff(centers)
+            near = np.minimum(np.append(gap, gap[-1]), np.insert(gap, 0, gap[0]))
+            halves = np.minimum(halves, np.maximum(near // 2, 2))
+        self._want, self.halves = want, halves
+        self.half = int(halves.max()) if len(halves) else self.min_half
+        self.centers = np.clip(centers, halves + 1, self.n - halves - 2)
+        h = halves[:, None]
+        off = np.arange(-self.half, self.half + 1)
+        self._col = np.clip(off, -h, h)                  # colonne oltre la propria half = bordo
+        self._win = self.centers[:, None] + self._col    # (picchi, finestra più larga)
+        self._mask = np.abs(off) <= h
+        self._Y = np.empty(self._win.shape)
+        self._rows = np.arange(len(self.centers))
+
+    def update(self, y: np.ndarray, t: float = None) -> dict:
+        """Raffina i picchi noti sul frame `y`; rifà la ricerca se serve."""
+        y = np.asarray(y, dtype=float)
+        self.frames += 1
+        if len(self.centers) == 0:
+            self.search(y)
+            if len(self.centers) == 0:
+                self.result = self._empty()
+                return self.result
+        np.take(y, self._win, out=self._Y)
+        Y = self._Y
+        # fondo locale: media dei due estremi della finestra
+        Y -= 0.5 * (Y[:, :1] + Y[:, -1:])
+        r, H, h = self._rows, self.half, self.halves
+        j = np.clip(np.argmax(Y, axis=1), H - h + 1, H + h - 1)
+        peak_px = self._win[r, j]
+
+        if self.method == "gauss":
+            # punti a ±k px (k ≈ σ): su righe larghe molti pixel è meno sensibile al rumore
+            k = np.maximum(1, (h / WINDOW_SIGMAS).astype(np.intp))
+            j = np.clip(j, H - h + k, H + h - k)
+            lm, l0, lp = (np.log(np.maximum(Y[r, j + d], 1e-9)) for d in (-k, 0, k))
+            d2 = lm - 2 * l0 + lp                    # < 0 per un massimo
+            with np.errstate(divide="ignore", invalid="ignore"):
+                delta = np.clip(0.5 * k * (lm - lp) / d2, -k, k)
+                sigma = k * np.sqrt(-1.0 / d2)
+            height = np.exp(l0 - 0.125 * (lm - lp) ** 2 / d2)
+            px = peak_px + delta
+            disp = np.interp(px, self._pix, self._disp)
+            fwhm = FWHM_PER_SIGMA * sigma * disp
+            area = height * sigma * disp * SQRT_2PI
+        else:                                        # centroid
+            Yp = np.maximum(Y, 0) * self._mask
+            s = Yp.sum(axis=1)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                px = (Yp * self._win).sum(axis=1) / s
+                var = (Yp * (self._win - px[:, None]) ** 2).sum(axis=1) / s
+            disp = np.interp(px, self._pix, self._disp)
+            height = Y[r, j]
+            fwhm = FWHM_PER_SIGMA * np.sqrt(var) * disp
+            area = s * disp
+
+        lost = ~(height > self.min_snr * self.noise)  # anche NaN
+        pos = np.interp(px, self._pix, self.wl)
+        for a in (pos, fwhm, area):
+            a[lost] = np.nan
+        res = dict(pos=pos, fwhm=fwhm, area=area, height=height)
+        with self._lock:
+            self.result = res
+            i = self._hist_i % HISTORY
+            self.history_t[i] = np.nan if t is None else t
+            for q in ("pos", "fwhm", "area"):
+                self.history[q][i, :len(pos)] = res[q]
+            self._hist_i += 1
+        if self._log is not None:
+            with self._lock:                         # close_log() dal thread della GUI
+                if self._log is not None:
+                    self._write_row(t, res)
+
+        new = np.where(lost, self.centers, peak_px)
+        if lost.all() or len(np.unique(new)) < len(new):  # persi, o due finestre sulla stessa riga
+            self.centers = np.zeros(0, dtype=np.intp)    # ricerca al prossimo frame
+        elif np.any(new != self.centers):
+            self._set_centers(new)
+        return res
+
+    __call__ = update                                # sink per AcqWorker (counts, t)
+
+    def snapshot(self) -> dict:
+        """Copia dell'ultimo risultato (lettura sicura da un altro thread)."""
+        with self._lock:
+            return {q: a.copy() for q, a in self.result.items()}
+
+    def series(self) -> tuple:
+        """(t, {pos, fwhm, area}) degli ultimi frame in ordine cronologico."""
+        with self._lock:
+            k = min(self._hist_i, HISTORY)
+            order = (np.arange(k) + self._hist_i - k) % HISTORY
+            return self.history_t[order], {q: h[order] for q, h in self.history.items()}
+
+    # ---------- serie temporale su CSV ----------------------------------
+    def open_log(self, path: str):
+        """Una riga per frame: t e, per ogni slot, posizione/FWHM/area (NaN se assente)."""
+        cols = ["t"] + [f"{q}{i + 1}{u}" for i in range(self.max_peaks)
+                        for q, u in (("pos", "_nm"), ("fwhm", "_nm"), ("area", ""))]
+        f = open(path, "w")
+        f.write(",".join(cols) + "\n")
+        with self._lock:
+            self._row = np.full(1 + 3 * self.max_peaks, np.nan)
+            self._log = f
+
+    def _write_row(self, t, res):
+        row = self._row
+        row[:] = np.nan
+        row[0] = np.nan if t is None else t
+        k = len(res["pos"])
+        row[1:1 + 3 * k:3] = res["pos"]
+        row[2:2 + 3 * k:3] = res["fwhm"]
+        row[3:3 + 3 * k:3] = res["area"]
+        self._log.write(",".join(f"{v:.6f}" for v in row) + "\n")
+
+    def close_log(self):
+        with self._lock:
+            f, self._log = self._log, None
+        if f is not None:
+            f.close()
+
+# --------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from specrec import open_recording
+
+    ap = argparse.ArgumentParser(description="Serie temporale dei picchi da un file .usbspec")
+    ap.add_argument("path")
+    ap.add_argument("-o", "--output", help="CSV di uscita (predefinito: <file>.peaks.csv)")
+    ap.add_argument("--max-peaks", type=int, default=10)
+    ap.add_argument("--half", type=int, default=6, help="semi-larghezza minima della finestra (px)")
+    ap.add_argument("--method", choices=METHODS, default="gauss")
+    args = ap.parse_args()
+
+    try:
+        header, wl, frames = open_recording(args.path)
+    except (OSError, ValueError) as e:
+        sys.exit(f"Errore: {e}")
+    tracker = PeakTracker(wl, args.half, args.max_peaks, method=args.method)
+    out = args.output or args.path.rsplit(".", 1)[0] + ".peaks.csv"
+    tracker.open_log(out)
+    pos = []
+    for rec in frames:
+        pos.append(tracker.update(rec["counts"], float(rec["t"]))["pos"])
+    tracker.close_log()
+    print(f"{len(frames)} frame, {tracker.searches} ricerche complete → {out}")
+    k = min(len(p) for p in pos) if pos else 0
+    if k:
+        p = np.array([q[:k] for q in pos])
+        for i in range(k):
+            print(f"  picco {i + 1}: {np.nanmean(p[:, i]):8.3f} nm  ± {np.nanstd(p[:, i]):.4f}")
@@ -0,0 +1,139 @@
+# specprof.py
+"""
+Sonde di temporizzazione per i percorsi caldi (lettura USB, lisciatura,
+strip CCD, ridisegno pyqtgraph, ...).
+
+Ogni stadio ha un buffer circolare preallocato con le ultime WINDOW durate;
+p50/p95/max si calcolano solo quando si chiede il rapporto (1 volta al
+secondo nei viewer), non a ogni frame. Da disattivato ogni sonda è una
+chiamata che controlla `enabled` e ritorna.
+
+    prof = Profiler(requested_fps=10)
+    prof.begin()                 # inizio frame: misura anche la frequenza ottenuta
+    ...; prof.lap("usb")         # durata dall'ultima sonda
+    ...; prof.lap("boxcar")
+    view.paintEvent = prof.wrap(view.paintEvent, "repaint")
+    print(prof.report())
+
+Nei viewer il rapporto va anche in un file di log (open_log / write_log).
+Dipendenze: numpy
+"""
+
+import time
+import numpy as np
+
+WINDOW = 256                      # durate conservate per stadio
+
+class Profiler:
+    def __init__(self, requested_fps: float = None, window: int = WINDOW,
+                 enabled: bool = False):
+        self.requested_fps = requested_fps
+        self.window = window
+        self.enabled = enabled
+        self._reset_pending = False
+        self.reset()
+
+    def reset(self):
+        self._ms = {}                             # stadio → buffer circolare (ms)
+        self._n = {}                              # stadio → durate registrate
+        self._frame = np.zeros(self.window)       # intervalli tra begin() (s)
+        self.frames = 0
+        self._t = self._t_begin = None
+
+    def set_enabled(self, on: bool):
+        """Chiamabile da qualsiasi thread: l'azzeramento lo fa il thread delle sonde in begin()."""
+        if on and not self.enabled:
+            self._reset_pending = True
+        self.enabled = on
+
+    # ---------- sonde ---------------------------------------------------
+    def begin(self):
+        if not self.enabled:
+            return
+        if self._reset_pending:
+            self._reset_pending = False
+            self.reset()
+        t = time.perf_counter()
+        if self._t_begin is not None:
+            self._frame[self.frames % self.window] = t - self._t_begin
+            self.frames += 1
+        self._t = self._t_begin = t
+
+    def lap(self, stage: str):
+        """Durata dalla sonda precedente (o da begin()) attribuita a `stage`."""
+        if not self.enabled:
+            return
+        t = time.perf_counter()
+        if self._t is not None:
+            self.add(stage, (t - self._t) * 1e3)
+        self._t = t
+
+    def add(self, stage: str, ms: float):
+        buf = self._ms.get(stage)
+        if buf is None:
+            self._n[stage] = 0
+            buf = self._ms[stage] = np.zeros(self.window)
+        buf[self._n[stage] % self.window] = ms
+        self._n[stage] += 1
+
+    def wrap(self, fn, stage: str):
+        """fn temporizzata come `stage` (es. un paintEvent, chiamato fuori da begin/lap)."""
+        def timed(*args, **kw):
+            if not self.enabled:
+                return fn(*args, **kw)
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kw)
+            finally:
+                self.add(stage, (time.perf_counter() - t0) * 1e3)
+        return timed
+
+    # ---------- rapporto ------------------------------------------------
+    def stats(self) -> dict:
+        """stadio → (n, p50, p95, max) in ms sulle ultime `window` durate."""
+        out = {}
+        for stage, buf in list(self._ms.items()):   # il dict può crescere in un altro thread
+            n = self._n.get(stage, 0)               # 0 se azzerato nel frattempo
+            if not n:
+                continue
+            v = buf[:min(n, self.window)]
+            p50, p95 = np.percentile(v, (50, 95))
+            out[stage] = (n, p50, p95, v.max())
+        return out
+
+    def fps(self) -> float:
+        k = min(self.frames, self.window)
+        return 1.0 / self._frame[:k].mean() if k else 0.0
+
+    def fps_text(self) -> str:
+        want = f"/{self.requested_fps:.0f}" if self.requested_fps else ""
+        return f"{self.fps():5.1f}{want} fps"
+
+    def summary(self) -> str:
+        """Una riga per la status bar: fps e p95 di ogni stadio."""
+        return " | ".join([self.fps_text()] + [f"{s} {p95:.1f}" for s, (_, _, p95, _)
+                                               in self.stats().items()]) + " ms p95"
+
+    def report(self, title: str = "") -> str:
+        """Tabella p50/p95/max per stadio."""
+        lines = [f"{title} {self.fps_text()}".strip(),
+                 f"{'stadio':<10}{'p50':>8}{'p95':>8}{'max':>8}  ms"]
+        lines += [f"{s:<10}{p50:8.2f}{p95:8.2f}{mx:8.2f}"
+                  for s, (_, p50, p95, mx) in self.stats().items()]
+        return "\n".join(lines)
+
+# ---------- file di log ---------------------------------------------------
+
+def open_log(path: str):
+    f = open(path, "a")
+    f.write("# time,source,stage,n,p50_ms,p95_ms,max_ms (stage=fps: n,fps ottenuti,fps richiesti)\n")
+    return f
+
+def write_log(f, source: str, prof: Profiler):
+    """Una riga per stadio più la frequenza ottenuta/richiesta."""
+    now = time.strftime("%Y-%m-%d %H:%M:%S")
+    f.write(f"{now},{source},fps,{prof.frames},{prof.fps():.2f},"
+            f"{prof.requested_fps or float('nan'):.2f},\n")
+    for s, (n, p50, p95, mx) in prof.stats().items():
+        f.write(f"{now},{source},{s},{n},{p50:.3f},{p95:.3f},{mx:.3f}\n")
+    f.flush()
@@ -0,0 +1,196 @@
+# specrec.py
+"""
+Registrazione continua in formato binario append-only (.usbspec).
+
+Struttura del file:
+    "USBSPEC1"                 8 byte, identificativo
+    lunghezza header           uint32 little-endian
+    header JSON                modello, seriale, integrazione, dtype, t0…
+                               (allineato a 8 byte con spazi)
+    asse λ                     float64[n_pixels], una sola volta
+    record                     (t float64, [integ_ms float32,] counts dtype[n_pixels])
+                               × n_frame; integ_ms c'è se l'header ha
+                               integ_per_frame (Recorder: sempre)
+
+I record hanno dimensione fissa: il file si legge con np.memmap senza alcun
+parsing e un file troncato (es. crash) perde al più l'ultimo record.
+`t` è time.monotonic(); l'ora assoluta si ricava da t0_epoch/t0_mono.
+`integ_ms` dell'header è l'integrazione all'avvio: con l'esposizione
+automatica quella di ogni frame è nel campo `integ_ms` del record.
+
+Conversione nel layout CSV usato finora:
+    python specrec.py registrazione.usbspec --csv cartella/ [--every N]
+Dipendenze: numpy
+"""
+
+import os, sys, json, time, queue, struct, threading, argparse
+import datetime as dt
+import numpy as np
+
+MAGIC = b"USBSPEC1"
+EXT = ".usbspec"
+
+def frame_dtype(n_pixels: int, counts_dtype: str = "<f4",
+                integ: bool = False) -> np.dtype:
+    """Record di un frame; `integ` aggiunge l'integrazione del frame (ms)."""
+    fields = [("t", "<f8")] + [("integ_ms", "<f4")] * integ
+    return np.dtype(fields + [("counts", counts_dtype, (n_pixels,))])
+
+def _preamble(wl: np.ndarray, counts_dtype: str, meta: dict) -> bytes:
+    """MAGIC + header JSON allineato a 8 byte + asse λ."""
+    header = dict(t0_epoch=time.time(), t0_mono=time.monotonic())
+    header.update(meta, n_pixels=len(wl), counts_dtype=counts_dtype)
+    hdr = json.dumps(header).encode()
+    hdr += b" " * (-(len(MAGIC) + 4 + len(hdr)) % 8)
+    return (MAGIC + struct.pack("<I", len(hdr)) + hdr
+            + np.ascontiguousarray(wl, dtype="<f8").tobytes())
+
+# ---------- scrittura -----------------------------------------------------
+
+class Recorder:
+    """
+    Scrive i frame in un thread separato: `write()` mette in coda e ritorna
+    subito, il thread raccoglie tutti i frame in attesa e li scrive in blocco.
+    Ogni record porta l'integrazione del frame (predefinita: `integ_ms` di meta).
+    """
+
+    def __init__(self, path: str, wl: np.ndarray, counts_dtype: str = "<f4",
+                 **meta):
+        self.path = path
+        self.n_pixels = len(wl)
+        self.dtype = frame_dtype(self.n_pixels, counts_dtype, integ=True)
+        self.integ_ms = meta.get("integ_ms")
+        self.frames = 0                       # frame accodati
+        self.errors = 0
+        self._f = open(path, "wb")
+        self._f.write(_preamble(wl, counts_dtype, dict(meta, integ_per_frame=True)))
+        self._q = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, counts: np.ndarray, t: float = None, integ_ms: float = None):
+        """Accoda un frame (thread-safe)."""
+        if integ_ms is None:
+            integ_ms = self.integ_ms
+        self._q.put((time.monotonic() if t is None else t,
+                     np.nan if integ_ms is None else integ_ms,
+                     np.asarray(counts, dtype=self.dtype["counts"].base)))
+        self.frames += 1
+
+    def close(self):
+        """Scrive i frame rimasti in coda e chiude il file."""
+        self._q.put(None)
+        self._thread.join()
+        self._f.close()
+
+    # ------------------------------------------------------------------
+    def _run(self):
+        block = np.zeros(64, dtype=self.dtype)
+        done = False
+        while not done:
+            items = [self._q.get()]
+            while True:                       # svuota tutto ciò che è in coda
+                try:
+                    items.append(self._q.get_nowait())
+                except queue.Empty:
+                    break
+            if items[-1] is None:
+                done = True
+                items.pop()
+            if len(items) > len(block):
+                block = np.zeros(len(items), dtype=self.dtype)
+            for i, (t, integ_ms, counts) in enumerate(items):
+                block[i]["t"] = t
+                block[i]["integ_ms"] = integ_ms
+                block[i]["counts"] = counts
+            try:
+                self._f.write(block[:len(items)].tobytes())
+                self._f.flush()
+            except (OSError, ValueError) as e:
+                self.errors += 1
+                print("Errore scrittura registrazione:", e)
+
+def write_recording(path: str, wl: np.ndarray, records: np.ndarray, **meta):
+    """
+    Scrive in una volta sola frame già in memoria: `records` è un array
+    con dtype frame_dtype(...) (es. il buffer di specburst.Burst).
+    """
+    counts_dtype = records.dtype["counts"].base.str
+    if "integ_ms" in records.dtype.names:
+        meta = dict(meta, integ_per_frame=True)
+    with open(path, "wb") as f:
+        f.write(_preamble(wl, counts_dtype, meta))
+        records.tofile(f)
+
+# ---------- lettura -------------------------------------------------------
+
+def read_header(path: str):
+    """Restituisce (header, asse λ, offset del primo record)."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path}: non è un file {EXT}")
+        (hdr_len,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(hdr_len))
+        wl = np.fromfile(f, dtype="<f8", count=header["n_pixels"])
+    return header, wl, len(MAGIC) + 4 + hdr_len + wl.nbytes
+
+def open_recording(path: str):
+    """
+    Apre una registrazione senza leggerla: restituisce (header, λ, frames)
+    dove frames è un np.memmap strutturato con campi "t" e "counts" (e
+    "integ_ms" se l'header ha integ_per_frame, vedi frame_integ_ms).
+    """
+    header, wl, offset = read_header(path)
+    dtype = frame_dtype(header["n_pixels"], header["counts_dtype"],
+                        header.get("integ_per_frame", False))
+    n = (os.path.getsize(path) - offset) // dtype.itemsize
+    if n == 0:
+        return header, wl, np.zeros(0, dtype=dtype)
+    return header, wl, np.memmap(path, dtype=dtype, mode="r",
+                                 offset=offset, shape=(n,))
+
+def frame_integ_ms(header: dict, frames: np.ndarray) -> np.ndarray:
+    """Integrazione di ogni frame (ms): dal record o, nei file vecchi, dall'header."""
+    if "integ_ms" in frames.dtype.names:
+        return np.asarray(frames["integ_ms"], dtype=float)
+    integ = header.get("integ_ms")
+    return np.full(len(frames), np.nan if integ is None else float(integ))
+
+def to_csv(path: str, out_dir: str, every: int = 1) -> int:
+    """Esporta un frame ogni `every` nel formato CSV di speclive4.py."""
+    header, wl, frames = open_recording(path)
+    os.makedirs(out_dir, exist_ok=True)
+    prefix = header.get("model", "usb2000").lower()
+    n = 0
+    for i in range(0, len(frames), every):
+        t = header["t0_epoch"] + frames["t"][i] - header["t0_mono"]
+        stamp = dt.datetime.fromtimestamp(t).strftime("%Y%m%d_%H%M%S")
+        fname = os.path.join(out_dir, f"{prefix}_{stamp}_{i:06d}.csv")
+        np.savetxt(fname, np.column_stack([wl, frames["counts"][i]]),
+                   delimiter=",", header="wavelength_nm,intensity_counts", comments='')
+        n += 1
+    return n
+
+# --------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Info e conversione di file " + EXT)
+    ap.add_argument("path")
+    ap.add_argument("--csv", metavar="DIR", help="esporta i frame come CSV in DIR")
+    ap.add_argument("--every", type=int, default=1, help="esporta un frame ogni N")
+    args = ap.parse_args()
+
+    try:
+        header, wl, frames = open_recording(args.path)
+    except (OSError, ValueError) as e:
+        sys.exit(f"Errore: {e}")
+    dur = frames["t"][-1] - frames["t"][0] if len(frames) > 1 else 0.0
+    print(f"{header.get('model', '?')}  S/N: {header.get('serial', '?')}  "
+          f"{header['n_pixels']} px, {len(frames)} frame in {dur:.1f} s")
+    integ = frame_integ_ms(header, frames)
+    if len(integ) and np.isfinite(integ).any():
+        lo, hi = np.nanmin(integ), np.nanmax(integ)
+        print(f"Integrazione: {lo:g} ms" if lo == hi else f"Integrazione: {lo:g}–{hi:g} ms")
+    if args.csv:
+        n = to_csv(args.path, args.csv, args.every)
+        print(f"Salvati {n} CSV in {args.csv}/")
@@ -0,0 +1,231 @@
+# specref.py
+"""
+Spettri di buio (dark) e di riferimento salvati su disco, e calcolo di
+trasmittanza / assorbanza per ogni frame.
+
+    T = (S − D) / (R − D)        A = −log10 T
+
+Dark e riferimento sono medie di n frame grezzi, salvate in
+~/.cache/usb2000-4000/ref con chiave seriale + calibrazione λ +
+integrazione + correzione dark elettrica. Ogni voce registra anche
+l'istante di acquisizione e, se nota, la temperatura: è considerata scaduta
+dopo MAX_AGE_S secondi o se la temperatura differisce più di TEMP_TOL °C.
+Cambiando integrazione si passa semplicemente a un'altra chiave.
+
+`RefProcessor` calcola una volta 1/(R − D) (NaN dove il riferimento non ha
+segnale); a ogni frame restano una sottrazione e una moltiplicazione (più un
+log10 per l'assorbanza) nel buffer preallocato.
+Dipendenze: numpy
+"""
+
+import os, json, time, hashlib
+import numpy as np
+from specavg import Averager
+
+REF_CACHE_DIR = os.path.expanduser("~/.cache/usb2000-4000/ref")
+KINDS = ("dark", "reference")
+MODES = ("counts", "transmittance", "absorbance")
+LABELS = {"counts": "Conteggi", "transmittance": "Trasmittanza", "absorbance": "Assorbanza"}
+COLUMNS = {"counts": "intensity_counts", "transmittance": "transmittance", "absorbance": "absorbance"}
+MAX_AGE_S = 3600                  # il buio deriva con la temperatura del sensore
+TEMP_TOL = 2.0
+T_MIN = 1e-4                      # assorbanza limitata a 4
+
+# ---------- cache su disco ------------------------------------------------
+
+class RefCache:
+    def __init__(self, serial: str, wl: np.ndarray, cache_dir: str = REF_CACHE_DIR,
+                 max_age_s: float = MAX_AGE_S):
+        wl = np.ascontiguousarray(wl, dtype=float)
+        self.prefix = f"{serial or 'nodev'}_{hashlib.sha1(wl.tobytes()).hexdigest()[:16]}"
+        self.n_pixels = len(wl)
+        self.cache_dir = cache_dir
+        self.max_age_s = max_age_s
+
+    def path(self, kind: str, integ_us: int, dark_correct: bool = True) -> str:
+        if kind not in KINDS:
+            raise ValueError(f"tipo sconosciuto: {kind!r} (usa {KINDS})")
+        return os.path.join(self.cache_dir,
+                            f"{self.prefix}_{round(integ_us)}us_ec{int(dark_correct)}_{kind}.npz")
+
+    def save(self, kind: str, counts: np.ndarray, integ_us: int, dark_correct: bool = True,
+             n_avg: int = 1, temperature: float = None) -> dict:
+        """Salva una media di `n_avg` frame; restituisce i metadati."""
+        meta = dict(kind=kind, integ_us=round(integ_us), dark_correct=bool(dark_correct),
+                    n_avg=int(n_avg), t_capture=time.time(), temperature=temperature)
+        path = self.path(kind, integ_us, dark_correct)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = path + ".tmp.npz"               # scrittura atomica
+            np.savez(tmp, counts=np.asarray(counts, dtype=float), meta=json.dumps(meta))
+            os.replace(tmp, path)
+        except OSError as e:                      # cache non scrivibile: si prosegue
+            print("Dark/riferimento non salvato:", e)
+        return meta
+
+    def load(self, kind: str, integ_us: int, dark_correct: bool = True,
+             temperature: float = None, stale_ok: bool = False):
+        """(counts, meta) se esiste una voce valida per queste impostazioni, altrimenti None."""
+        path = self.path(kind, integ_us, dark_correct)
+        try:
+            with np.load(path) as f:
+                counts, meta = f["counts"], json.loads(str(f["meta"]))
+        except (OSError, ValueError, KeyError):
+            return None
+        if counts.shape != (self.n_pixels,):
+            return None
+        if not stale_ok and self.is_stale(meta, temperature):
+            return None
+        return counts, meta
+
+    def is_stale(self, meta: dict, temperature: float = None) -> bool:
+        if time.time() - meta["t_capture"] > self.max_age_s:
+            return True
+        t0 = meta.get("temperature")
+        return temperature is not None and t0 is not None and abs(temperature - t0) > TEMP_TOL
+
+    def clear(self, integ_us: int, dark_correct: bool = True):
+        for kind in KINDS:
+            try:
+                os.remove(self.path(kind, integ_us, dark_correct))
+            except OSError:
+                pass
+
+# ---------- calcolo per frame ---------------------------------------------
+
+class RefProcessor:
+    def __init__(self, n_pixels: int, mode: str = "counts"):
+        self.dark = None
+        self.reference = None
+        self._inv = None                          # 1 / (R − D)
+        self.out = np.empty(n_pixels)
+        self.mode = "counts"
+        self.set_mode(mode)
+
+    def set_dark(self, dark):
+        self.dark = None if dark is None else np.asarray(dark, dtype=float).copy()
+        self._update()
+
+    def set_reference(self, reference):
+        self.reference = None if reference is None else np.asarray(reference, dtype=float).copy()
+        self._update()
+
+    def _update(self):
+        self._inv = None
+        if self.reference is not None:
+            r = self.reference - self.dark if self.dark is not None else self.reference.copy()
+            with np.errstate(divide="ignore", invalid="ignore"):
+                self._inv = np.where(r > 0, 1.0 / r, np.nan)
+        if self.mode != "counts" and self._inv is None:
+            self.mode = "counts"                  # riferimento rimosso o scaduto
+
+    def set_mode(self, mode: str):
+        if mode not in MODES:
+            raise ValueError(f"modalità sconosciuta: {mode!r} (usa {MODES})")
+        if mode != "counts" and self._inv is None:
+            raise ValueError(f"{mode} richiede uno spettro di riferimento")
+        self.mode = mode
+
+    def __call__(self, counts: np.ndarray) -> np.ndarray:
+        """Frame elaborato nel buffer `out` (valido fino alla chiamata successiva)."""
+        if self.dark is None:
+            if self.mode == "counts":
+                return counts
+            np.copyto(self.out, counts)
+        else:
+            np.subtract(counts, self.dark, out=self.out)
+        if self.mode != "counts":
+            self.out *= self._inv
+            if self.mode == "absorbance":
+                np.maximum(self.out, T_MIN, out=self.out)   # NaN restano NaN
+                np.log10(self.out, out=self.out)
+                self.out *= -1
+        return self.out
+
+# ---------- insieme: cache + calcolo --------------------------------------
+
+class References:
+    """
+    Dark e riferimento per uno spettrometro: cattura, cache su disco e
+    ricarica automatica quando cambiano le impostazioni.
+
+        refs = References(spec.serial_number, wl, integ_us=10000)
+        refs.store("dark", media_dei_frame, n_avg=20)
+        y = refs.process(counts)
+    """
+
+    def __init__(self, serial: str, wl: np.ndarray, integ_us: int, dark_correct: bool = True,
+                 cache_dir: str = REF_CACHE_DIR, max_age_s: float = MAX_AGE_S):
+        self.cache = RefCache(serial, wl, cache_dir, max_age_s)
+        self.proc = RefProcessor(len(wl))
+        self.meta = dict.fromkeys(KINDS)
+        self.dark_correct = dark_correct
+        self.integ_us = None
+        self.set_integration(integ_us)
+
+    @property
+    def mode(self) -> str:
+        return self.proc.mode
+
+    def set_mode(self, mode: str):
+        self.proc.set_mode(mode)
+
+    def set_integration(self, integ_us: int, temperature: float = None):
+        """Nuove impostazioni: dark e riferimento vengono dalla voce corrispondente, se valida."""
+        self.integ_us = round(integ_us)
+        for kind in KINDS:
+            hit = self.cache.load(kind, self.integ_us, self.dark_correct, temperature)
+            self.meta[kind] = hit[1] if hit else None
+            self._set(kind, hit[0] if hit else None)
+
+    def _set(self, kind, counts):
+        if kind == "dark":
+            self.proc.set_dark(counts)
+        else:
+            self.proc.set_reference(counts)
+
+    def store(self, kind: str, counts: np.ndarray, n_avg: int = 1, temperature: float = None):
+        self.meta[kind] = self.cache.save(kind, counts, self.integ_us, self.dark_correct,
+                                          n_avg, temperature)
+        self._set(kind, counts)
+
+    def forget(self):
+        """Cancella dark e riferimento per le impostazioni attuali."""
+        self.cache.clear(self.integ_us, self.dark_correct)
+        self.meta = dict.fromkeys(KINDS)
+        self.proc.set_dark(None)
+        self.proc.set_reference(None)
+
+    def process(self, counts: np.ndarray) -> np.ndarray:
+        return self.proc(counts)
+
+    def describe(self) -> str:
+        """Es. 'dark 3 min fa, rif —' per la status bar."""
+        parts = []
+        for kind, name in zip(KINDS, ("dark", "rif")):
+            m = self.meta[kind]
+            parts.append(f"{name} {(time.time() - m['t_capture']) / 60:.0f} min fa" if m
+                         else f"{name} —")
+        return ", ".join(parts)
+
+# ---------- cattura da AcqWorker ------------------------------------------
+
+class Capture:
+    """
+    Sink per AcqWorker.sinks: media i prossimi `n_avg` frame grezzi e poi
+    smette di accumulare. `result` è None finché la media non è pronta.
+    """
+
+    def __init__(self, kind: str, n_pixels: int, n_avg: int = 20):
+        if kind not in KINDS:
+            raise ValueError(f"tipo sconosciuto: {kind!r} (usa {KINDS})")
+        self.kind = kind
+        self.n_avg = n_avg
+        self.avg = Averager(n_pixels, n_avg, "block")
+        self.result = None
+
+    def __call__(self, counts: np.ndarray, t: float = None):
+        if self.result is None:
+            res = self.avg.add(counts)
+            if res is not None:
+                self.result = res.copy()
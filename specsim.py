@@ -0,0 +1,168 @@
+# specsim.py
+"""
+Spettrometro simulato con la stessa interfaccia di seabreeze Spectrometer
+(wavelengths, intensities, integration_time_micros, model, serial_number,
+close): permette di provare e misurare acquisizione, lisciatura, rendering
+ed export senza USB2000/USB4000 collegato.
+
+    - numero di pixel e modello configurabili (USB2000 2048 px 12 bit,
+      USB4000 3648 px 16 bit)
+    - intensities() blocca per il tempo di integrazione, come il dispositivo
+    - rumore (shot + lettura), offset di buio, saturazione
+    - errori USB iniettabili con probabilità `error_rate`
+    - riproduzione di spettri registrati (CSV di examples/data o .usbspec)
+
+Selezione da qualsiasi script (vedi specdev.py):
+    USB2000_SIM=1 python speclive4.py
+    python speclive4.py --sim=model=USB4000,error_rate=0.01
+    python spec.py --sim=replay=examples/data
+    python speclive2.py "--sim=USB2000;USB4000"      # due dispositivi (';')
+Dipendenze: numpy
+"""
+
+import os, glob, time
+import numpy as np
+
+try:
+    from seabreeze._exc import SeaBreezeError as SimUSBError
+except ImportError:                      # simulatore usabile anche senza seabreeze
+    class SimUSBError(IOError):
+        pass
+
+MODELS = {
+    # modello: (pixel, λ min, λ max, saturazione, offset di buio)
+    "USB2000": (2048, 177.6, 876.9, 4095, 90.0),
+    "USB4000": (3648, 178.0, 890.0, 65535, 1500.0),
+}
+INTEG_MIN_US = {"USB2000": 3000, "USB4000": 10}
+INTEG_MAX_US = 65_535_000
+
+# righe di emissione simulate (λ nm, ampiezza per 1 ms, FWHM nm): tipo Hg/Ar
+LINES = [(253.7, 40, 1.5), (365.0, 25, 1.5), (404.7, 35, 1.5), (435.8, 80, 1.5),
+         (546.1, 120, 1.5), (577.0, 45, 1.5), (696.5, 30, 1.5), (763.5, 50, 1.5),
+         (811.5, 35, 1.5)]
+
+def _load_replay(path: str):
+    """Asse λ e frame (n, pixel) da una cartella di CSV, un CSV o un .usbspec."""
+    from specrec import EXT, open_recording
+    if path.endswith(EXT):
+        _, wl, frames = open_recording(path)
+        return wl, np.asarray(frames["counts"], dtype=float)
+    files = ([path] if os.path.isfile(path)
+             else sorted(glob.glob(os.path.join(path, "**", "*.csv"), recursive=True)))
+    if not files:
+        raise SimUSBError(f"nessuno spettro da riprodurre in {path}")
+    data = [np.loadtxt(f, delimiter=",", skiprows=1) for f in files]
+    n = len(data[0])
+    data = [d for d in data if len(d) == n]
+    return data[0][:, 0], np.array([d[:, 1] for d in data])
+
+# ---------- dispositivo simulato ------------------------------------------
+
+class SimSpectrometer:
+    def __init__(self, model: str = "USB2000", n_pixels: int = None,
+                 serial: str = "SIM00001", noise: float = 1.0,
+                 error_rate: float = 0.0, replay: str = None, seed: int = None,
+                 realtime: bool = True):
+        model = model.upper()
+        px, wl0, wl1, self.saturation, self.dark = MODELS.get(model, MODELS["USB2000"])
+        self.model = model
+        self.max_intensity = self.saturation  # come seabreeze
+        self.integration_time_micros_limits = (INTEG_MIN_US.get(model, 3000), INTEG_MAX_US)
+        self.serial_number = serial
+        self.noise = noise
+        self.error_rate = error_rate
+        self.realtime = realtime              # False: nessuna attesa (benchmark)
+        self.rng = np.random.default_rng(seed)
+        self._integ_us = 10000
+        self._t_last = None
+        self._closed = False
+
+        self._replay = None
+        if replay:
+            self._wl, self._replay = _load_replay(replay)
+            self._i = 0
+        else:
+            n = n_pixels or px
+            self._wl = np.linspace(wl0, wl1, n)
+            # profilo "per ms" precalcolato: righe gaussiane + continuo debole
+            prof = 2.0 * np.exp(-0.5 * ((self._wl - 600) / 150) ** 2)
+            for lam, amp, fwhm in LINES:
+                sigma = fwhm / 2.3548
+                prof += amp * np.exp(-0.5 * ((self._wl - lam) / sigma) ** 2)
+            self._profile = prof
+
+    @classmethod
+    def from_first_available(cls, **kw):
+        return cls(**kw)
+
+    # ---- interfaccia tipo seabreeze -----------------------------------
+    def wavelengths(self) -> np.ndarray:
+        return self._wl.copy()
+
+    def integration_time_micros(self, us: int):
+        self._integ_us = int(us)
+
+    def intensities(self, correct_dark_counts: bool = False) -> np.ndarray:
+        if self._closed:
+            raise SimUSBError("dispositivo chiuso")
+        # come il dispositivo: letture consecutive distano un'integrazione,
+        # una lettura in ritardo attende un'integrazione intera
+        if self.realtime:
+            integ_s = self._integ_us / 1e6
+            now = time.perf_counter()
+            if self._t_last is None or now >= self._t_last + integ_s:
+                due = now + integ_s
+            else:
+                due = self._t_last + integ_s
+            time.sleep(due - now)
+            self._t_last = due
+
+        if self.error_rate and self.rng.random() < self.error_rate:
+            raise SimUSBError("errore USB simulato (timeout)")
+
+        if self._replay is not None:
+            y = self._replay[self._i % len(self._replay)].copy()
+            self._i += 1
+            if self.noise:
+                y += self.rng.normal(0, self.noise, y.shape)
+            return y
+
+        signal = self._profile * (self._integ_us / 1000)
+        y = signal + self.dark
+        if self.noise:
+            y += self.rng.normal(0, 1, y.shape) * self.noise * np.sqrt(signal + 25)
+        np.clip(y, 0, self.saturation, out=y)
+        np.floor(y, out=y)                 # conteggi interi come l'ADC
+        if correct_dark_counts:
+            y -= self.dark
+        return y
+
+    def close(self):
+        self._closed = True
+
+# ---------- configurazione da stringa -------------------------------------
+
+def from_config(cfg: str, **defaults) -> SimSpectrometer:
+    """
+    "1" / "" → valori predefiniti; altrimenti coppie chiave=valore separate
+    da virgole, es. "model=USB4000,noise=2,error_rate=0.01,replay=examples/data".
+    `defaults` vale per le chiavi non presenti in `cfg`.
+    """
+    kw = dict(defaults)
+    for item in cfg.split(","):
+        key, sep, val = item.partition("=")
+        if not sep:
+            if key.strip().upper() in MODELS:     # "USB4000" da solo
+                kw["model"] = key.strip()
+            continue
+        key, val = key.strip(), val.strip()
+        if key in ("noise", "error_rate"):
+            kw[key] = float(val)
+        elif key in ("n_pixels", "seed"):
+            kw[key] = int(val)
+        elif key == "realtime":
+            kw[key] = val not in ("0", "false", "no")
+        else:
+            kw[key] = val
+    return SimSpectrometer(**kw)
@@ -0,0 +1,237 @@
+# specsmooth.py
+"""
+Lisciatura condivisa da tutti gli script (sostituisce le copie di boxcar).
+
+    boxcar    media mobile con somme cumulative: O(N) qualunque sia la larghezza
+    savgol    Savitzky–Golay, coefficienti calcolati una volta e messi in cache
+    gaussian  gaussiana, kernel in cache
+
+Per kernel larghi (> FFT_MIN_WIDTH campioni) la convoluzione passa
+automaticamente alla FFT. Tutte le funzioni lavorano sull'ultimo asse, quindi
+accettano anche un blocco (frame, pixel), e scrivono in `out` se fornito.
+
+Bordi (`edge`):
+    reflect   specchio senza ripetere il campione di bordo (predefinito)
+    nearest   ripete il campione di bordo
+    zero      zeri fuori dall'array: il vecchio np.convolve(mode="same"),
+              che fa "calare" i bordi
+    shrink    media solo sui campioni disponibili (kernel non negativi)
+
+Per l'uso a ogni frame `Smoother` conserva i buffer di lavoro tra le chiamate.
+Dipendenze: numpy
+"""
+
+from functools import lru_cache
+import numpy as np
+
+EDGES = ("reflect", "nearest", "zero", "shrink")
+FFT_MIN_WIDTH = 64
+BOXCAR_DIRECT_MAX = 7             # fino a 7 campioni la somma diretta batte cumsum
+_PAD = {"reflect": "reflect", "nearest": "edge", "zero": "constant", "shrink": "constant"}
+
+# ---------- coefficienti in cache -----------------------------------------
+
+@lru_cache(maxsize=64)
+def savgol_coeffs(half: int, polyorder: int = 2, deriv: int = 0) -> np.ndarray:
+    """Coefficienti Savitzky–Golay per una finestra di 2*half+1 campioni."""
+    if polyorder >= 2 * half + 1:
+        raise ValueError("polyorder deve essere minore della finestra 2*half+1")
+    x = np.arange(-half, half + 1, dtype=float)
+    A = np.vander(x, polyorder + 1, increasing=True)
+    c = np.linalg.pinv(A)[deriv] * np.prod(np.arange(1, deriv + 1))
+    c.setflags(write=False)
+    return c
+
+@lru_cache(maxsize=64)
+def gaussian_kernel(sigma: float, truncate: float = 4.0) -> np.ndarray:
+    """Kernel gaussiano normalizzato, semi-larghezza truncate·sigma."""
+    half = max(1, int(truncate * sigma + 0.5))
+    x = np.arange(-half, half + 1, dtype=float)
+    k = np.exp(-0.5 * (x / sigma) ** 2)
+    k /= k.sum()
+    k.setflags(write=False)
+    return k
+
+# ---------- convoluzione --------------------------------------------------
+
+def _check_edge(edge: str):
+    if edge not in EDGES:
+        raise ValueError(f"bordo sconosciuto: {edge!r} (usa {EDGES})")
+
+def _pad(y: np.ndarray, half: int, edge: str) -> np.ndarray:
+    width = [(0, 0)] * (y.ndim - 1) + [(half, half)]
+    if edge == "reflect" and y.shape[-1] < 2:
+        edge = "nearest"
+    return np.pad(y, width, mode=_PAD[edge])
+
+def _correlate_valid(yp: np.ndarray, k: np.ndarray, n: int, out: np.ndarray) -> np.ndarray:
+    """out[..., i] = Σ_j k[j]·yp[..., i+j], diretto o via FFT per kernel larghi."""
+    w = len(k)
+    if w > FFT_MIN_WIDTH:
+        m = 1 << int(np.ceil(np.log2(yp.shape[-1] + w - 1)))
+        f = np.fft.rfft(yp, m, axis=-1) * np.fft.rfft(k[::-1], m)
+        out[...] = np.fft.irfft(f, m, axis=-1)[..., w - 1:w - 1 + n]
+        return out
+    np.multiply(yp[..., :n], k[0], out=out)
+    for j in range(1, w):
+        out += k[j] * yp[..., j:j + n]
+    return out
+
+def convolve(y, kernel: np.ndarray, edge: str = "reflect", out: np.ndarray = None) -> np.ndarray:
+    """Applica un kernel simmetrico di lunghezza dispari lungo l'ultimo asse."""
+    _check_edge(edge)
+    if edge == "shrink" and np.any(kernel < 0):
+        raise ValueError("edge='shrink' richiede un kernel non negativo")
+    y = np.asarray(y, dtype=float)
+    half = len(kernel) // 2
+    n = y.shape[-1]
+    if out is None:
+        out = np.empty_like(y)
+    _correlate_valid(_pad(y, half, edge), kernel, n, out)
+    if edge == "shrink":
+        out /= _correlate_valid(_pad(np.ones(n), half, "zero"), kernel, n, np.empty(n))
+    return out
+
+# ---------- filtri --------------------------------------------------------
+
+def boxcar(y, half: int = 1, edge: str = "reflect", out: np.ndarray = None) -> np.ndarray:
+    """Media mobile su 2*half+1 campioni con somme cumulative: O(N)."""
+    if half < 1:
+        return y
+    return Smoother("boxcar", half, edge)(y, out)
+
+def savgol(y, half: int, polyorder: int = 2, edge: str = "reflect",
+           out: np.ndarray = None) -> np.ndarray:
+    """Savitzky–Golay su 2*half+1 campioni (preserva altezza e larghezza dei picchi)."""
+    return convolve(y, savgol_coeffs(half, polyorder), edge, out)
+
+def gaussian(y, sigma: float, edge: str = "reflect", out: np.ndarray = None) -> np.ndarray:
+    """Lisciatura gaussiana con deviazione standard `sigma` in pixel."""
+    return convolve(y, gaussian_kernel(float(sigma)), edge, out)
+
+class Smoother:
+    """
+    Filtro riutilizzabile: parametri fissati una volta, buffer di lavoro
+    conservati tra le chiamate (stessa forma dei dati e `out` fornito →
+    nessuna allocazione per il boxcar). Non condividere un'istanza tra thread.
+
+        sm = Smoother("boxcar", 5)            # 11 campioni
+        sm = Smoother("savgol", 7, polyorder=3)
+        sm = Smoother("gaussian", 3.0)        # sigma in pixel
+    """
+
+    def __init__(self, kind: str = "boxcar", size=1, edge: str = "reflect",
+                 polyorder: int = 2):
+        _check_edge(edge)
+        self.kind, self.size, self.edge = kind, size, edge
+        if kind == "boxcar":
+            self.kernel = None
+            self.half = int(size)
+        elif kind == "savgol":
+            self.kernel = savgol_coeffs(int(size), polyorder)
+            self.half = int(size)
+        elif kind == "gaussian":
+            self.kernel = gaussian_kernel(float(size))
+            self.half = len(self.kernel) // 2
+        else:
+            raise ValueError(f"filtro sconosciuto: {kind!r}")
+        self._shape = None
+
+    def _alloc(self, shape):
+        n, h = shape[-1], self.half
+        w = 2 * h + 1
+        self._shape = shape
+        p = self._pad = np.zeros(shape[:-1] + (n + 2 * h,))
+        self._cs = np.zeros(shape[:-1] + (n + 2 * h + 1,))
+        # viste fisse sul buffer: a ogni frame niente slicing, solo ufunc con out=
+        mid = self._mid = p[..., h:h + n]
+        self._terms = [p[..., j:j + n] for j in range(w)]
+        self._wide = self.edge == "reflect" and 1 < n <= h   # finestra più larga dei dati
+        if self.edge == "reflect" and h < n:
+            self._edges = [(p[..., :h], mid[..., h:0:-1]), (p[..., h + n:], mid[..., -2:-h - 2:-1])]
+        elif self.edge == "nearest" or (self.edge == "reflect" and n == 1):
+            self._edges = [(p[..., :h], mid[..., :1]), (p[..., h + n:], mid[..., -1:])]
+        else:                                         # zero / shrink: bordi già a zero
+            self._edges = []
+        self._direct = w <= BOXCAR_DIRECT_MAX
+        self._scale = 1.0 / w                         # moltiplicare costa meno che dividere
+        if self.edge == "shrink":                     # n. campioni validi per pixel
+            i = np.arange(n)
+            self._scale = 1.0 / (np.minimum(i + h, n - 1) - np.maximum(i - h, 0) + 1)
+        self._prescale = self._direct and self.edge != "shrink"
+
+    def __call__(self, y, out: np.ndarray = None) -> np.ndarray:
+        y = np.asarray(y, dtype=float)
+        if self.half < 1:
+            if out is None:
+                return y
+            out[...] = y
+            return out
+        if self.kernel is not None:
+            return convolve(y, self.kernel, self.edge, out)
+
+        # boxcar: somme sull'array esteso ai bordi
+        if y.shape != self._shape:
+            self._alloc(y.shape)
+        if self._prescale:                            # 1/w applicato copiando: una passata in meno
+            np.multiply(y, self._scale, out=self._mid)
+        else:
+            np.copyto(self._mid, y)
+        for dst, src in self._edges:
+            np.copyto(dst, src)
+        if self._wide:
+            self._pad[...] = _pad(self._mid, self.half, "reflect")
+        if out is None:
+            out = np.empty_like(y)
+        t = self._terms
+        if self._direct:                              # pochi termini: fette traslate sommate in `out`
+            np.add(t[0], t[1], out=out)
+            for v in t[2:]:
+                np.add(out, v, out=out)
+            if not self._prescale:
+                np.multiply(out, self._scale, out=out)
+        else:                                         # finestre larghe: O(N)
+            cs, w = self._cs, len(t)
+            np.cumsum(self._pad, axis=-1, out=cs[..., 1:])
+            np.subtract(cs[..., w:], cs[..., :-w], out=out)
+            np.multiply(out, self._scale, out=out)
+        return out
+        if self.kernel is not None:
+            return convolve(y, self.kernel, self.edge, out)
+
+        # boxcar: somme sull'array esteso ai bordi
+        if y.shape != self._shape:
+            self._alloc(y.shape)
+        n, h = y.shape[-1], self.half
+        p, mid = self._pad, self._mid
+        direct = len(self._terms) <= BOXCAR_DIRECT_MAX
+        if direct and self.edge != "shrink":          # 1/w applicato copiando: una passata in meno
+            np.multiply(y, self._scale, out=mid)
+        else:
+            mid[...] = y
+        if self.edge == "reflect" and h < n:
+            p[..., :h] = mid[..., h:0:-1]
+            p[..., h + n:] = mid[..., -2:-h - 2:-1]
+        elif self.edge == "reflect" and n > 1:        # finestra più larga dei dati
+            p[...] = _pad(mid, h, "reflect")
+        elif self.edge == "nearest" or (self.edge == "reflect" and n == 1):
+            p[..., :h] = mid[..., :1]
+            p[..., h + n:] = mid[..., -1:]
+        else:                                         # zero / shrink
+            p[..., :h] = 0
+            p[..., h + n:] = 0
+        if out is None:
+            out = np.empty_like(y)
+        if direct:                                    # pochi termini: fette traslate sommate in `out`
+            t = self._terms
+            np.add(t[0], t[1], out=out)
+            for v in t[2:]:
+                np.add(out, v, out=out)
+            if self.edge == "shrink":
+                np.multiply(out, self._scale, out=out)
+        else:                                         # finestre larghe: O(N)
+            w = len(self._terms)
+            np.cumsum(p, axis=-1, out=self._cs[..., 1:])
+            np.subtract(self._cs[..., w:], self._cs[..., :-w], out=out)
+            np.multiply(out, self._scale, out=out)
+        return out
@@ -0,0 +1,136 @@
+# specstart.py
+"""
+Avvio rapido di speclive4.py.
+
+La finestra compare subito, prima di aprire lo spettrometro. La connessione
+(import di seabreeze, apertura, λ e tabella colori della strip CCD) avviene
+in un thread: se non c'è nessun dispositivo riprova ogni RETRY_S secondi,
+così basta collegarlo senza riavviare. Intanto il thread della GUI importa
+speclive4 (pyqtgraph); gli exporter PNG e matplotlib si importano solo al
+primo utilizzo. Quando lo spettrometro è pronto la finestra di attesa lascia
+il posto al viewer e vengono riportati i tempi di avvio:
+
+    finestra 0.7 s | modulo 0.2 s | spettrometro 0.9 s | primo frame 1.1 s
+
+    python specstart.py [--sim]
+Dipendenze: numpy, pyqtgraph, seabreeze
+"""
+
+import time
+T0 = time.perf_counter()                    # prima degli import pesanti
+
+import sys, threading
+from pyqtgraph.Qt import QtWidgets, QtCore
+
+RETRY_S = 2.0
+FIRST_FRAME_POLL_MS = 10
+
+# ---------- connessione in background -------------------------------------
+
+class Connector(QtCore.QObject):
+    """Apre lo spettrometro in un thread; i segnali arrivano nel thread della GUI."""
+    connected = QtCore.Signal(object)
+    waiting = QtCore.Signal(str)
+
+    def __init__(self, retry_s: float = RETRY_S):
+        super().__init__()
+        self.retry_s = retry_s
+        self.attempts = 0
+        self._halt = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def stop(self):
+        self._halt.set()
+
+    def _run(self):
+        from specdev import open_spectrometer
+        from seabreeze._exc import SeaBreezeError
+        from specccd import rgb_table
+        while not self._halt.is_set():
+            self.attempts += 1
+            try:
+                spec = open_spectrometer()
+                rgb_table(spec.wavelengths(), spec.serial_number)  # pronta per il viewer
+            except (SeaBreezeError, OSError) as e:
+                self.waiting.emit(f"Nessuno spettrometro ({e}).\n"
+                                  f"Nuovo tentativo ogni {self.retry_s:g} s "
+                                  f"(tentativi: {self.attempts})…")
+                self._halt.wait(self.retry_s)
+                continue
+            if self._halt.is_set():                     # finestra chiusa nel frattempo
+                spec.close()
+                return
+            self.connected.emit(spec)
+            return
+
+# ---------- finestra di attesa --------------------------------------------
+
+class Launcher(QtWidgets.QMainWindow):
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("USB2000 – avvio")
+        self.resize(900, 600)
+        self.label = QtWidgets.QLabel("Connessione allo spettrometro…")
+        self.label.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        self.setCentralWidget(self.label)
+        self.times = {}                                 # fase → secondi da T0
+        self.live = None                                # modulo speclive4
+        self.win = None
+        self.connector = Connector()
+        self.connector.connected.connect(self._connected)
+        self.connector.waiting.connect(self.label.setText)
+        self.connector.start()
+        QtCore.QTimer.singleShot(0, self._shown)        # dopo il primo paint
+
+    def _mark(self, phase: str):
+        self.times.setdefault(phase, time.perf_counter() - T0)
+
+    def _shown(self):
+        self._mark("finestra")
+        self._load()
+
+    def _load(self):
+        """Import di speclive4 (pyqtgraph, moduli spec*) mentre il dispositivo si apre."""
+        if self.live is None:
+            import speclive4
+            self.live = speclive4
+            self._mark("modulo")
+
+    def _connected(self, spec):
+        self._mark("spettrometro")
+        self._load()
+        try:
+            self.win = self.live.LiveSpectrum(spec)
+        except Exception as e:                          # viewer non avviabile: resta la finestra di attesa
+            self.label.setText(f"Errore all'avvio del viewer:\n{type(e).__name__}: {e}")
+            spec.close()
+            return
+        self.win.setGeometry(self.geometry())
+        self.win.show()
+        self.close()
+        self._poll = QtCore.QTimer(self.win)
+        self._poll.timeout.connect(self._check_first_frame)
+        self._poll.start(FIRST_FRAME_POLL_MS)
+
+    def _check_first_frame(self):
+        if self.win.last_counts is None:
+            return
+        self._poll.stop()
+        self._mark("primo frame")
+        msg = " | ".join(f"{k} {v:.2f} s" for k, v in self.times.items())
+        print("Avvio:", msg)
+        self.win.statusBar().showMessage(f"Avvio: {msg}", 8000)
+
+    def closeEvent(self, ev):
+        if self.win is None:
+            self.connector.stop()
+        ev.accept()
+
+# --------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    app = QtWidgets.QApplication(sys.argv)
+    launcher = Launcher(); launcher.show()
+    sys.exit(app.exec())
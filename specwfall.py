@@ -0,0 +1,90 @@
+# specwfall.py
+"""
+Waterfall live (λ × tempo) su buffer circolare a dimensione fissa.
+
+Il buffer è un'immagine RGB32 di `n_rows` righe × pixel: ogni frame scrive
+una sola riga (indici 0–255 → colore con una LUT precalcolata, np.take) e
+avanza la testa. Nessun np.roll e nessuna ricostruzione dell'immagine: in
+paint() il buffer viene disegnato in due pezzi, [testa, n) sopra e [0, testa)
+sotto, così la riga più recente è sempre in fondo. Il costo per frame è
+O(pixel) qualunque sia la lunghezza della storia.
+
+    wf = Waterfall(wl, n_rows=600, levels=(0, 4095))
+    glw.addItem(view_box(wf), row=2, col=0)
+    wf.add(counts)                     # a ogni frame mostrato
+Dipendenze: numpy, pyqtgraph
+"""
+
+import numpy as np
+import pyqtgraph as pg
+from pyqtgraph.Qt import QtCore, QtGui
+
+def lut_argb(name: str = "viridis") -> np.ndarray:
+    """LUT di 256 colori come uint32 0xAARRGGBB (formato di QImage RGB32)."""
+    rgb = pg.colormap.get(name).getLookupTable(nPts=256).astype(np.uint32)
+    return 0xFF000000 | (rgb[:, 0] << 16) | (rgb[:, 1] << 8) | rgb[:, 2]
+
+def view_box(wf: "Waterfall") -> pg.ViewBox:
+    """ViewBox fisso per il waterfall: asse λ come il grafico, tempo verso il basso."""
+    vb = pg.ViewBox(enableMenu=False)
+    vb.setMouseEnabled(x=False, y=False)
+    vb.invertY(True)
+    vb.addItem(wf)
+    r = wf.mapRectToParent(wf.boundingRect())
+    vb.setXRange(r.left(), r.right(), padding=0)
+    vb.setYRange(0, wf.n_rows, padding=0)
+    return vb
+
+class Waterfall(pg.GraphicsObject):
+    def __init__(self, wl: np.ndarray, n_rows: int = 600, levels: tuple = (0.0, 65535.0),
+                 cmap: str = "viridis"):
+        super().__init__()
+        n = len(wl)
+        self.n_rows = n_rows
+        # righe RGB32: Qt richiede alfa 0xFF, nero = nessun dato
+        self.img = np.full((n_rows, n), 0xFF000000, dtype=np.uint32)
+        self.lut = lut_argb(cmap)
+        self.head = 0                                       # prossima riga da scrivere
+        self.frames = 0
+        self._f = np.empty(n)
+        self._idx = np.empty(n, dtype=np.intp)
+        self.set_levels(*levels)
+        # pixel → λ come la strip CCD (asse lineare tra il primo e l'ultimo λ)
+        self.setTransform(QtGui.QTransform.fromTranslate(wl[0], 0)
+                          .scale((wl[-1] - wl[0]) / n, 1))
+
+    def set_levels(self, lo: float, hi: float):
+        self.lo = float(lo)
+        self.scale = 255.0 / (hi - lo) if hi > lo else 1.0
+
+    def clear(self):
+        self.img[:] = 0xFF000000
+        self.head = self.frames = 0
+        self.update()
+
+    # ------------------------------------------------------------------
+    def add(self, counts: np.ndarray):
+        """Scrive una riga (O(pixel)) e chiede il ridisegno."""
+        np.subtract(counts, self.lo, out=self._f)
+        self._f *= self.scale
+        # NaN dove il riferimento è buio (trasmittanza/assorbanza): fondo scala
+        np.nan_to_num(self._f, copy=False, nan=0.0, posinf=255.0, neginf=0.0)
+        np.clip(self._f, 0, 255, out=self._f)
+        np.copyto(self._idx, self._f, casting="unsafe")
+        np.take(self.lut, self._idx, out=self.img[self.head])
+        self.head = (self.head + 1) % self.n_rows
+        self.frames += 1
+        self.update()
+
+    # ---------- QGraphicsItem ------------------------------------------
+    def boundingRect(self):
+        return QtCore.QRectF(0, 0, self.img.shape[1], self.n_rows)
+
+    def paint(self, p, *args):
+        # QImage ricreato a ogni paint (nessuna copia): il contenuto è cambiato
+        qimg = pg.functions.ndarray_to_qimage(self.img, QtGui.QImage.Format.Format_RGB32)
+        w, h, k = self.img.shape[1], self.n_rows, self.head
+        # righe più vecchie [k, h) in alto, più recenti [0, k) in basso
+        p.drawImage(QtCore.QRectF(0, 0, w, h - k), qimg, QtCore.QRectF(0, k, w, h - k))
+        if k:
+            p.drawImage(QtCore.QRectF(0, h - k, w, k), qimg, QtCore.QRectF(0, 0, w, k))
@@ -0,0 +1,3 @@
+# Gli script spec*.py sono moduli nella radice del repository.
+import os, sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
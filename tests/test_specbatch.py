@@ -0,0 +1,20 @@
+import glob, os
+import numpy as np
+import pytest
+from specbatch import process_file
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                    "examples", "data")
+OPTS = dict(dark=None, smooth=1, max_peaks=5, png=None)
+
+@pytest.mark.parametrize("path", sorted(glob.glob(os.path.join(DATA, "*", "*.csv"))),
+                         ids=os.path.basename)
+def test_peak_positions_are_distinct(path):
+    row = process_file((path, "", OPTS))
+    assert row["error"] == ""
+    pos = np.array(row["pos"])
+    found = pos[np.isfinite(pos)]
+    assert len(found) == row["n_peaks"]
+    assert np.isfinite(pos[:row["n_peaks"]]).all()         # picchi trovati nei primi slot
+    if len(found) > 1:
+        assert np.diff(np.sort(found)).min() > 0.5            # nm: mai la stessa riga due volte
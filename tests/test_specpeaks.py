@@ -0,0 +1,18 @@
+import numpy as np
+from specpeaks import PeakTracker
+
+def gauss(px, c, sigma, a):
+    return a * np.exp(-0.5 * ((px - c) / sigma) ** 2)
+
+def test_close_lines_next_to_broad_feature_stay_separate():
+    # due righe strette a 18 px l'una dall'altra e, poco oltre, una banda larga più alta
+    px = np.arange(2048.0)
+    wl = 400.0 + 0.2 * px
+    y = 100 + gauss(px, 1000, 2, 1000) + gauss(px, 1018, 2, 900) + gauss(px, 1080, 15, 3000)
+    tracker = PeakTracker(wl, max_peaks=5)
+    for _ in range(5):
+        res = tracker.update(y)
+    assert len(np.unique(tracker.centers)) == len(tracker.centers) == 3
+    assert tracker.searches == 1
+    np.testing.assert_allclose(res["pos"], wl[[1000, 1018, 1080]], atol=0.05)
+    np.testing.assert_allclose(res["fwhm"][:2], 2 * 2.3548 * 0.2, rtol=0.1)